@@ -2,75 +2,202 @@
 import sys
 import os
 import logging
-from llmsherpa.readers import LayoutPDFReader
+from collections import OrderedDict, deque
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QToolBar, QFileDialog, QSpinBox,
-                             QPushButton, QTextEdit, QWidget, QLabel, QListWidget, QLineEdit, QCheckBox, QDialog)
-from PyQt6.QtCore import QThread, pyqtSignal
+                             QPushButton, QTextEdit, QWidget, QLabel, QListWidget, QListWidgetItem, QLineEdit,
+                             QCheckBox, QDialog, QDoubleSpinBox)
+from PyQt6.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
 from PyQt6.QtGui import QAction
 # get our custom summarization module and query module
 import sum_text
 import query_doc
+from model_manager import manager as model_manager
+from parse_cache import CachedPDFReader
+from document_model import DocumentModel
+from directory_index import FileManifest, CHANGED, UNCHANGED
+from job_scheduler import (scheduler, JobCancelled, PRIORITY_INTERACTIVE, PRIORITY_FOREGROUND, PRIORITY_BACKGROUND,
+                           PRIORITY_PREFETCH)
+from disk_cache import cache_stats
+import telemetry
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("RAGapp.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Configure logging, records are written as JSON lines off the GUI thread
+telemetry.configure_logging("RAGapp.log")
 logger = logging.getLogger(__name__)
 
 llmsherpa_api_url = "http://localhost:5010/api/parseDocument?renderFormat=all"
+PREFETCH_CONCURRENCY = 2     # documents parsed and indexed at once when prefetching a directory
+MAX_LOADED_DOCUMENTS = 16    # parsed and indexed documents kept in memory
+SCAN_BATCH_SIZE = 200        # files added to the file list per update while a directory is scanned
+RESCAN_DELAY_MS = 1000       # wait for a burst of file system events to settle before rescanning
 
-class SummarizationWorker(QThread):
-    """Worker thread for summarizing text."""
+class ParseWorker(QObject):
+    """Parse and index one document on the shared job scheduler."""
+    progress = pyqtSignal(str, str)            # path, stage
+    finished = pyqtSignal(str, object, object)  # path, DocumentModel, SectionIndex
+    error = pyqtSignal(str, str)               # path, error message
+    cancelled = pyqtSignal(str)                # path
+
+    def __init__(self, reader, path, document_id, manifest=None):
+        super().__init__()
+        self.reader = reader
+        self.path = path
+        self.document_id = document_id
+        self.manifest = manifest
+
+    def run(self, token):
+        """Parse, build the document model and encode it, checking for cancellation between stages."""
+        try:
+            with telemetry.document_context(self.document_id):
+                self.progress.emit(self.path, "parsing")
+                # stat before hashing, an edit during the parse then shows up as a change on the next scan
+                stat = os.stat(self.path) if self.manifest else None
+                content_hash = self.manifest.current_hash(self.path) if self.manifest else None
+                parsed_doc = self.reader.read_pdf(self.path, content_hash=content_hash)
+                token.check()
+                if not parsed_doc:
+                    self.error.emit(self.path, "No content parsed from file.")
+                    return
+                self.progress.emit(self.path, "indexing")
+                doc_model = DocumentModel(parsed_doc, self.document_id)
+                token.check()
+                doc_index = query_doc.build_section_index(doc_model)
+            token.check()
+            if self.manifest:
+                # the parse and the embeddings are cached now, later scans can skip this file
+                self.manifest.mark_indexed(self.path, content_hash, stat)
+            self.finished.emit(self.path, doc_model, doc_index)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            self.error.emit(self.path, f"Error parsing file: {e}")
+
+
+class DirectoryScanner(QObject):
+    """Walk a directory tree on the job scheduler and report its PDFs with their manifest status."""
+    found = pyqtSignal(int, list)             # scan id, [(relative path, status)]
+    finished = pyqtSignal(int, list, list)    # scan id, every relative path found, directories visited
+    error = pyqtSignal(int, str)              # scan id, error message
+
+    def __init__(self, manifest, directory, scan_id, has_parse=None):
+        super().__init__()
+        self.manifest = manifest
+        self.directory = directory
+        self.scan_id = scan_id
+        self.has_parse = has_parse  # files whose cached parse was evicted are reported STALE
+
+    def run(self, token):
+        """Send the files in batches as they are found, so a large share fills the list progressively."""
+        try:
+            paths, batch, directories = [], [], []
+            for path, status in self.manifest.scan(self.directory, directories, self.has_parse):
+                rel_path = os.path.relpath(path, self.directory)
+                paths.append(rel_path)
+                batch.append((rel_path, status))
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    token.check()
+                    self.found.emit(self.scan_id, batch)
+                    batch = []
+            token.check()
+            if batch:
+                self.found.emit(self.scan_id, batch)
+            self.finished.emit(self.scan_id, paths, directories)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            self.error.emit(self.scan_id, f"Error scanning directory: {e}")
+
+class SummarizationWorker(QObject):
+    """Summarization job run on the shared job scheduler."""
     finished = pyqtSignal(str)  # Signal to emit the summarized text
+    partial = pyqtSignal(int, int, str)  # Signal to emit each chunk summary: index, chunk count, summary
     error = pyqtSignal(str)     # Signal to emit error messages
 
-    def __init__(self, text):
+    def __init__(self, text, latency_budget=None, document_id=None):
         super().__init__()
         self.text = text
+        self.latency_budget = latency_budget
+        self.document_id = document_id
 
-    def run(self):
-        """Perform the summarization in a separate thread."""
+    def run(self, token):
+        """Perform the summarization on a scheduler thread, emitting each chunk summary as it is ready."""
         try:
-            summary = sum_text.summarize_text(self.text)
-            self.finished.emit(summary)  # Emit the summarized text
+            summaries = []
+            with telemetry.document_context(self.document_id):
+                for index, total, summary in sum_text.iter_summaries(self.text, latency_budget=self.latency_budget):
+                    # stop between chunks if a newer request superseded this one
+                    token.check()
+                    summaries.append(summary)
+                    self.partial.emit(index, total, summary)
+            self.finished.emit("\n".join(summaries))  # Emit the summarized text
+        except JobCancelled:
+            raise
         except Exception as e:
             self.error.emit(f"Error during summarization: {e}")
 
-class QueryWorker(QThread):
-    """Worker thread for querying the document."""
+class DocumentSummaryWorker(QObject):
+    """Whole document map-reduce summarization job run on the shared job scheduler."""
+    finished = pyqtSignal(str)  # Signal to emit the document brief
+    error = pyqtSignal(str)     # Signal to emit error messages
+
+    def __init__(self, parsed_doc, document_id=None):
+        super().__init__()
+        self.parsed_doc = parsed_doc
+        self.document_id = document_id
+
+    def run(self, token):
+        """Summarize the whole document across the worker processes."""
+        try:
+            with telemetry.document_context(self.document_id):
+                summary, timings = sum_text.summarize_document(self.parsed_doc, token=token)
+            levels = ", ".join(f"level {t['level']}: {t['seconds']:.1f}s" for t in timings)
+            self.finished.emit(f"{summary}\n\n({levels})")
+        except JobCancelled:
+            raise
+        except Exception as e:
+            self.error.emit(f"Error during document summarization: {e}")
+
+class QueryWorker(QObject):
+    """Query job run on the shared job scheduler."""
     finished = pyqtSignal(str)  # Signal to emit the query result
     error = pyqtSignal(str)     # Signal to emit error messages
 
-    def __init__(self, query, context, qa_response, n_results=1):
+    def __init__(self, query, index, qa_response, n_results=1, document_id=None):
         super().__init__()
         self.query = query
-        self.context = context
+        self.index = index
         self.qa_response = qa_response
         self.n_results = n_results
+        self.document_id = document_id
         
-    def run(self):
-        """Perform the query processing in a separate thread."""
+    def run(self, token):
+        """Perform the query processing on a scheduler thread."""
         try:
-            if not self.qa_response:
-                response = query_doc.query_document(self.query, self.context)
-            else:
-                response = query_doc.get_top_result(self.context, self.query, self.n_results)
+            with telemetry.document_context(self.document_id):
+                if not self.qa_response:
+                    response = query_doc.query_document(self.query, self.index)
+                else:
+                    # section aware ranking, each hit is shown with the title of its section
+                    response = query_doc.get_top_section_results(self.index, self.query, self.n_results)
+            # a newer query for the same document may have superseded this one
+            token.check()
             self.finished.emit(response)  # Emit the query result
+        except JobCancelled:
+            raise
         except Exception as e:
             self.error.emit(f"Error during querying: {e}")
 
 class MainWindow(QMainWindow):
+    model_status_changed = pyqtSignal(str, str)  # model name, status from the model manager threads
     # get cwd
     cwd = os.getcwd()
-    reader = LayoutPDFReader(llmsherpa_api_url)
+    reader = CachedPDFReader(llmsherpa_api_url)
     parsed_doc = None
+    doc_model = None  # section and sentence lookups, built once per parse
+    doc_index = None
     qa_response = False
     n_results = 1
+    latency_budget = None  # seconds allowed for a summary, None always uses the default summarizer
+    prefetch = False       # parse and index new and changed PDFs in the background when a directory is loaded
     
     # TODO: add save functionality for summary text
     def __init__(self):
@@ -86,6 +213,11 @@ class MainWindow(QMainWindow):
         settings_action = QAction("Settings", self)
         settings_action.triggered.connect(self.open_settings_dialog)
         self.toolbar.addAction(settings_action)
+
+        # Add a "Diagnostics" action showing where the time goes
+        diagnostics_action = QAction("Diagnostics", self)
+        diagnostics_action.triggered.connect(self.open_diagnostics_dialog)
+        self.toolbar.addAction(diagnostics_action)
         
         # Central widget
         central_widget = QWidget()
@@ -108,7 +240,7 @@ class MainWindow(QMainWindow):
         doc_display_layout.addWidget(self.doc_display_label)
         self.doc_display = QListWidget()
         doc_display_layout.addWidget(self.doc_display)
-        self.doc_display.currentTextChanged.connect(self.show_section_content)
+        self.doc_display.currentRowChanged.connect(self.show_section_content)
         
         # Create a horizontal layout for file explorer and button
         file_explorer_with_button_layout = QHBoxLayout()
@@ -157,11 +289,47 @@ class MainWindow(QMainWindow):
         # Summarize button
         self.summarize_btn = QPushButton("Summarize Response")
         self.summarize_btn.clicked.connect(self.summarize_response)
-        main_layout.addWidget(self.summarize_btn)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.cancel_jobs)
+        summarize_layout = QHBoxLayout()
+        summarize_layout.addWidget(self.summarize_btn)
+        self.summarize_doc_btn = QPushButton("Summarize Document")
+        self.summarize_doc_btn.clicked.connect(self.summarize_document)
+        summarize_layout.addWidget(self.summarize_doc_btn)
+        summarize_layout.addWidget(self.cancel_btn)
+        main_layout.addLayout(summarize_layout)
         
         # Status label
         self.status_label = QLabel("Status: Ready")
         main_layout.addWidget(self.status_label)
+        
+        # Model status indicator, models load on first use so the window comes up right away
+        self.model_status_label = QLabel()
+        main_layout.addWidget(self.model_status_label)
+        self.model_status_changed.connect(self.update_model_status)
+        # documents parsed and indexed in the background, by path, least recently used first
+        self.loaded_documents = OrderedDict()
+        self.parse_workers = {}   # path -> ParseWorker still running, kept alive until it reports
+        self.prefetching = set()  # paths of the running prefetch jobs
+        self.prefetch_queue = deque()
+        self.requested_path = None  # the file the user asked to read, installed as soon as it is loaded
+        # which files were already indexed, so reopening a directory only touches new and changed ones
+        self.manifest = FileManifest()
+        self.file_items = {}        # relative path -> item of file_list_widget
+        self.needs_index = set()    # paths of new or changed files that are not indexed yet
+        self.scanner = None
+        self.scan_id = 0
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.schedule_rescan)
+        self.watcher.fileChanged.connect(self.schedule_rescan)
+        self.rescan_timer = QTimer(self)
+        self.rescan_timer.setSingleShot(True)
+        self.rescan_timer.setInterval(RESCAN_DELAY_MS)
+        self.rescan_timer.timeout.connect(self.rescan_directory)
+        model_manager.add_listener(self.model_status_changed.emit)
+        self.update_model_status()
+        # warm up the embedding model in the background, it is needed as soon as a file is read
+        model_manager.preload("embedding")
         logger.info("RAG Application started. prompting for directory.")
         # give the file explorer the cwd
         self.load_directory_contents()
@@ -182,6 +350,29 @@ class MainWindow(QMainWindow):
         n_results_spinbox.valueChanged.connect(self.update_n_results)
         layout.addWidget(n_results_spinbox)
 
+        # Latency budget for summaries, a faster summarizer is picked when BART would not fit
+        layout.addWidget(QLabel("Summary latency budget in seconds (0 = no budget):"))
+        budget_spinbox = QDoubleSpinBox()
+        budget_spinbox.setRange(0, 600)
+        budget_spinbox.setSingleStep(0.5)
+        budget_spinbox.setValue(self.latency_budget or 0)
+        budget_spinbox.valueChanged.connect(self.update_latency_budget)
+        layout.addWidget(budget_spinbox)
+
+        # Background parsing of every PDF in a loaded directory
+        prefetch_checkbox = QCheckBox("Index new and changed documents in the background")
+        prefetch_checkbox.setChecked(self.prefetch)
+        prefetch_checkbox.stateChanged.connect(self.update_prefetch)
+        layout.addWidget(prefetch_checkbox)
+
+        # Parse cache controls
+        reparse_button = QPushButton("Re-parse Selected File")
+        reparse_button.clicked.connect(self.reparse_file)
+        layout.addWidget(reparse_button)
+        clear_cache_button = QPushButton("Clear Parse Cache")
+        clear_cache_button.clicked.connect(self.clear_parse_cache)
+        layout.addWidget(clear_cache_button)
+
         # Close button
         close_button = QPushButton("Close")
         close_button.clicked.connect(dialog.close)
@@ -189,59 +380,231 @@ class MainWindow(QMainWindow):
 
         dialog.exec()
     
+    def open_diagnostics_dialog(self):
+        """Open a panel with recent stage latencies, cache hit rates and model memory."""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Diagnostics")
+        dialog.setGeometry(200, 200, 600, 500)
+        layout = QVBoxLayout(dialog)
+        report = QTextEdit()
+        report.setReadOnly(True)
+        layout.addWidget(report)
+        reset_button = QPushButton("Reset Timings")
+        reset_button.clicked.connect(telemetry.metrics.reset)
+        layout.addWidget(reset_button)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(dialog.close)
+        layout.addWidget(close_button)
+
+        def refresh():
+            report.setPlainText(self.diagnostics_report())
+        # refresh while the panel is open so running jobs show up as they finish
+        timer = QTimer(dialog)
+        timer.timeout.connect(refresh)
+        timer.start(1000)
+        refresh()
+        dialog.exec()
+
+    def diagnostics_report(self):
+        """Return the diagnostics panel text."""
+        lines = ["Stage latencies (ms):", f"{'stage':12s} {'count':>6s} {'last':>9s} {'p50':>9s} {'p95':>9s}"]
+        for stage, stats in sorted(telemetry.metrics.summary().items()):
+            lines.append(f"{stage:12s} {stats['count']:6d} {stats['last_ms']:9.1f} "
+                         f"{stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f}")
+        lines += ["", "Caches:"]
+        for name, stats in sorted(cache_stats().items()):
+            rate = "n/a" if stats["hit_rate"] is None else f"{stats['hit_rate']:.0%}"
+            lines.append(f"{name}: {stats['entries']} entries, {stats['hits']} hits, "
+                         f"{stats['misses']} misses, hit rate {rate}")
+        lines.append(f"summaries (memory): {sum_text.summary_cache.memory_hits} hits")
+        lines += ["", f"Models ({model_manager.loaded_size_mb():.0f} MB loaded):"]
+        lines += [f"{name}: {status}" for name, status in model_manager.statuses().items()]
+        lines += ["", "Recent spans:"]
+        for entry in telemetry.metrics.recent(15):
+            tags = ", ".join(f"{k}={v}" for k, v in entry.items() if k not in ("stage", "ms"))
+            lines.append(f"{entry['stage']:12s} {entry['ms']:9.1f} ms  {tags}")
+        return "\n".join(lines)
+
+    def update_model_status(self, name=None, status=None):
+        """Show the load state of every registered model."""
+        statuses = model_manager.statuses()
+        text = " | ".join(f"{name}: {status}" for name, status in statuses.items())
+        self.model_status_label.setText(f"Models: {text} ({model_manager.loaded_size_mb():.0f} MB)")
+
     def update_n_results(self, value):
         """Update the n_results value."""
         self.n_results = value
         logger.info(f"n_results updated to: {self.n_results}")    
     
+    def update_latency_budget(self, value):
+        """Update the summary latency budget."""
+        self.latency_budget = value or None
+        logger.info(f"latency_budget updated to: {self.latency_budget}")
+
+    def update_prefetch(self, state):
+        """Turn directory prefetching on or off."""
+        self.prefetch = state == 2  # 2 means checked
+        logger.info(f"prefetch updated to: {self.prefetch}")
+        if self.prefetch:
+            self.prefetch_directory()
+        else:
+            self.cancel_prefetch()
+
     def single_response_change(self, state):
         """Handle the single response checkbox state change."""
         logger.info(f"single_response signal: {state}")
         self.qa_response = state == 2  # 2 means checked
         
+    def document_path(self, name):
+        return os.path.join(os.path.relpath(self.cwd), name)
+
     def parse_file(self):
-        """Parse the selected PDF file."""
-        pdf_path = os.path.join(os.path.relpath(self.cwd), self.current_doc_path)
-        logger.info(f"clicked signal: parse_file with path: {pdf_path}")
+        """Parse and index the selected PDF file in the background."""
+        logger.info(f"clicked signal: parse_file with path: {self.current_doc_path}")
         if not self.current_doc_path:
             self.status_label.setText("Status: No file selected.")
             return
-        try:
-            
-            response = self.reader.read_pdf(pdf_path)
-            if response:
-                self.parsed_doc = response
-                self.query_label.setText(f"Enter your query for: {self.current_doc_path}")
-                self.status_label.setText("Status: File parsed successfully.")
-                self.doc_display_label.setText(f"parsed sections for: {self.current_doc_path}")
-                # show the section titles in the file explorer
-                self.doc_display.clear()
-                for section in self.parsed_doc.sections():
-                    self.doc_display.addItem(section.title)
-            else:
-                self.status_label.setText("Status: No content parsed from file.")
-                
-        except Exception as e:
-            logger.error(f"Error parsing file: {e}")
-            self.status_label.setText("Status: Error parsing file.")
-            self.parsed_doc = None
-    
-    def show_section_content(self, section_title):
+        pdf_path = self.document_path(self.current_doc_path)
+        self.requested_path = pdf_path
+        if pdf_path in self.loaded_documents:
+            # already prefetched, nothing left to wait for
+            self.install_document(pdf_path)
+            return
+        if pdf_path in self.parse_workers:
+            # a prefetch is already on it, move it to the front of the queue and install it when it finishes
+            scheduler.promote(f"prefetch:{pdf_path}", PRIORITY_FOREGROUND)
+            self.status_label.setText(f"Status: Waiting for background parse of {self.current_doc_path}...")
+            return
+        self.status_label.setText(f"Status: Parsing {self.current_doc_path}...")
+        # foreground, not interactive, so a long parse never takes the worker kept free for queries
+        self.start_parse(pdf_path, PRIORITY_FOREGROUND, "parse")
+
+    def start_parse(self, pdf_path, priority, key):
+        """Submit a ParseWorker for pdf_path to the scheduler."""
+        worker = ParseWorker(self.reader, pdf_path, os.path.basename(pdf_path), self.manifest)
+        worker.progress.connect(self.on_parse_progress)
+        worker.finished.connect(self.on_parse_complete)
+        worker.error.connect(self.on_parse_error)
+        worker.cancelled.connect(self.on_parse_cancelled)
+        self.parse_workers[pdf_path] = worker
+        scheduler.submit(worker.run, priority=priority, key=key,
+                         on_cancel=lambda: worker.cancelled.emit(pdf_path))
+
+    def on_parse_progress(self, pdf_path, stage):
+        if pdf_path == self.requested_path:
+            self.status_label.setText(f"Status: {stage.capitalize()} {os.path.basename(pdf_path)}...")
+
+    def parse_done(self, pdf_path):
+        self.parse_workers.pop(pdf_path, None)
+        self.prefetching.discard(pdf_path)
+
+    def on_parse_complete(self, pdf_path, doc_model, doc_index):
+        """Keep the loaded document and show it if it is the one the user asked for."""
+        self.parse_done(pdf_path)
+        self.needs_index.discard(pdf_path)
+        self.loaded_documents[pdf_path] = (doc_model, doc_index)
+        self.loaded_documents.move_to_end(pdf_path)
+        # directory events miss in-place edits, so watch the loaded files themselves
+        self.watcher.addPath(os.path.abspath(pdf_path))
+        while len(self.loaded_documents) > MAX_LOADED_DOCUMENTS:
+            evicted, _ = self.loaded_documents.popitem(last=False)
+            self.watcher.removePath(os.path.abspath(evicted))
+        if pdf_path == self.requested_path:
+            self.install_document(pdf_path)
+        self.next_prefetch()
+
+    def on_parse_error(self, pdf_path, error_message):
+        self.parse_done(pdf_path)
+        logger.error(f"{pdf_path}: {error_message}")
+        if pdf_path == self.requested_path:
+            self.status_label.setText(f"Status: {error_message}")
+            self.requested_path = None
+        self.next_prefetch()
+
+    def on_parse_cancelled(self, pdf_path):
+        self.parse_done(pdf_path)
+        if pdf_path == self.requested_path:
+            self.status_label.setText("Status: Parse cancelled.")
+            self.requested_path = None
+        self.next_prefetch()
+
+    def install_document(self, pdf_path):
+        """Make a loaded document the one that is queried and shown."""
+        self.doc_model, self.doc_index = self.loaded_documents[pdf_path]
+        self.loaded_documents.move_to_end(pdf_path)
+        self.parsed_doc = self.doc_model.parsed_doc
+        self.requested_path = None
+        name = os.path.basename(pdf_path)
+        self.query_label.setText(f"Enter your query for: {name}")
+        self.status_label.setText("Status: File parsed successfully.")
+        self.doc_display_label.setText(f"parsed sections for: {name}")
+        # show the section titles in the file explorer, row i is section i of the model
+        self.doc_display.clear()
+        self.doc_display.addItems(self.doc_model.titles)
+
+    def prefetch_directory(self):
+        """Queue the new and changed PDFs of the current directory for background parsing and indexing."""
+        self.prefetch_queue = deque(
+            path for path in (self.document_path(rel_path) for rel_path in self.file_items)
+            if path in self.needs_index and path not in self.loaded_documents
+        )
+        logger.info(f"Prefetching {len(self.prefetch_queue)} documents.")
+        for _ in range(PREFETCH_CONCURRENCY):
+            self.next_prefetch()
+
+    def next_prefetch(self):
+        """Start the next queued prefetch if fewer than PREFETCH_CONCURRENCY are running."""
+        limit = PREFETCH_CONCURRENCY
+        if self.requested_path in self.parse_workers and self.requested_path not in self.prefetching:
+            # leave a background worker for the file the user is waiting on
+            limit -= 1
+        while self.prefetch_queue and len(self.prefetching) < limit:
+            pdf_path = self.prefetch_queue.popleft()
+            if pdf_path in self.loaded_documents or pdf_path in self.parse_workers:
+                continue
+            self.prefetching.add(pdf_path)
+            self.start_parse(pdf_path, PRIORITY_PREFETCH, f"prefetch:{pdf_path}")
+
+    def cancel_prefetch(self):
+        """Drop the queued prefetches and cancel the running ones."""
+        self.prefetch_queue.clear()
+        for pdf_path in list(self.prefetching):
+            if pdf_path != self.requested_path:
+                scheduler.cancel(f"prefetch:{pdf_path}")
+
+    def reparse_file(self):
+        """Drop the cached parse of the selected file and parse it again."""
+        logger.info("clicked signal: reparse_file")
+        if self.current_doc_path:
+            pdf_path = self.document_path(self.current_doc_path)
+            self.reader.invalidate(pdf_path)
+            self.loaded_documents.pop(pdf_path, None)
+        self.parse_file()
+
+    def clear_parse_cache(self):
+        """Drop every cached parse so documents go back to the parse service."""
+        logger.info("clicked signal: clear_parse_cache")
+        self.reader.invalidate()
+        self.loaded_documents.clear()
+        # nothing counts as indexed any more
+        self.manifest.forget()
+        self.rescan_directory()
+        self.status_label.setText("Status: Parse cache cleared.")
+
+    def show_section_content(self, row):
         """Show the content of the selected section."""
-        logger.info(f"clicked signal: show_section_content with title: {section_title}")
-        if not self.parsed_doc:
+        if row < 0:
+            # the list was cleared
+            return
+        logger.info(f"clicked signal: show_section_content with row: {row}")
+        if not self.doc_model:
             self.status_label.setText("Status: No parsed document available.")
             return
-        for section in self.parsed_doc.sections():
-            if section.title == section_title:
-                paragraphs = [p.to_text() for p in section.paragraphs()]
-                # flatten the list of paragraphs
-                # paragraphs = [sentence for sublist in paragraphs for sentence in sublist]
-                self.summary_out_put.setText("\n".join(paragraphs))
-                self.status_label.setText(f"Status: Displaying content for section: {section_title}")
-                return
-        
-        self.status_label.setText("Status: Section not found.")
+        if row >= len(self.doc_model.sections):
+            self.status_label.setText("Status: Section not found.")
+            return
+        self.summary_out_put.setText(self.doc_model.section_text(row))
+        self.status_label.setText(f"Status: Displaying content for section: {self.doc_model.titles[row]}")
                
     def change_f_path(self, fp):
         self.current_doc_path = fp
@@ -249,24 +612,100 @@ class MainWindow(QMainWindow):
         logger.info(f"currentTextChanged signal: {fp}")
     
     def load_directory_contents(self):
-        """Load files from the current directory into the file explorer."""
+        """Load the PDFs under a directory into the file explorer, scanning it in the background."""
         logger.info(f"clicked signal: load_directory_contents")
         # bring up a file browser popup
-        try:
-            directory = QFileDialog.getExistingDirectory(self, "Select Directory", self.cwd)
-            if directory:
-                files = os.listdir(directory)
-                self.cwd = directory
-            else:
-                self.status_label.setText(f'failed to load directory: {directory}')
-            self.file_list_widget.clear()
-            for file in files:
-                self.file_list_widget.addItem(file)
-            
-            self.status_label.setText(f"Status: Files loaded from {directory}.")
-        except Exception as e:
-            logger.error(f"Error loading files: {e}")
-            self.status_label.setText("Status: Error loading files.")
+        directory = QFileDialog.getExistingDirectory(self, "Select Directory", self.cwd)
+        if not directory:
+            self.status_label.setText(f'failed to load directory: {directory}')
+            return
+        self.cwd = directory
+        self.cancel_prefetch()
+        self.needs_index.clear()
+        self.file_items.clear()
+        self.file_list_widget.clear()
+        if self.watcher.directories():
+            self.watcher.removePaths(self.watcher.directories())
+        self.status_label.setText(f"Status: Scanning {directory}...")
+        self.start_scan(PRIORITY_FOREGROUND)
+
+    def start_scan(self, priority):
+        """Scan the current directory on the scheduler, superseding a scan that is still running."""
+        self.scan_id += 1
+        self.scanner = DirectoryScanner(self.manifest, self.cwd, self.scan_id, self.reader.has)
+        self.scanner.found.connect(self.on_scan_batch)
+        self.scanner.finished.connect(self.on_scan_complete)
+        self.scanner.error.connect(self.on_scan_error)
+        scheduler.submit(self.scanner.run, priority=priority, key="scan")
+
+    def schedule_rescan(self, path):
+        """Rescan once the file system has been quiet for RESCAN_DELAY_MS."""
+        logger.info(f"File system change: {path}")
+        self.rescan_timer.start()
+
+    def rescan_directory(self):
+        self.start_scan(PRIORITY_BACKGROUND)
+
+    def on_scan_batch(self, scan_id, entries):
+        """Add newly found files to the list and queue the new and changed ones for indexing."""
+        if scan_id != self.scan_id:
+            # results of a superseded scan
+            return
+        queued = False
+        for rel_path, status in entries:
+            item = self.file_items.get(rel_path)
+            if item is None:
+                item = QListWidgetItem(rel_path)
+                self.file_list_widget.addItem(item)
+                self.file_items[rel_path] = item
+            item.setToolTip(status)
+            if status == UNCHANGED:
+                continue
+            pdf_path = self.document_path(rel_path)
+            if status == CHANGED and pdf_path in self.loaded_documents:
+                logger.info(f"{pdf_path} changed on disk, dropping the loaded version.")
+                del self.loaded_documents[pdf_path]
+                self.watcher.removePath(os.path.abspath(pdf_path))
+            if pdf_path in self.needs_index:
+                # found by an earlier scan and already queued
+                continue
+            self.needs_index.add(pdf_path)
+            if self.prefetch:
+                self.prefetch_queue.append(pdf_path)
+                queued = True
+        if queued:
+            self.next_prefetch()
+        self.status_label.setText(f"Status: Scanning {self.cwd}... {len(self.file_items)} files")
+
+    def on_scan_complete(self, scan_id, rel_paths, directories):
+        """Drop files that disappeared and watch the scanned directories for changes."""
+        if scan_id != self.scan_id:
+            return
+        self.scanner = None
+        for rel_path in set(self.file_items) - set(rel_paths):
+            item = self.file_items.pop(rel_path)
+            self.file_list_widget.takeItem(self.file_list_widget.row(item))
+            pdf_path = self.document_path(rel_path)
+            self.needs_index.discard(pdf_path)
+            if self.loaded_documents.pop(pdf_path, None) is not None:
+                self.watcher.removePath(os.path.abspath(pdf_path))
+        watched = set(self.watcher.directories())
+        added = [d for d in directories if d not in watched]
+        removed = list(watched - set(directories))
+        if added:
+            self.watcher.addPaths(added)
+        if removed:
+            self.watcher.removePaths(removed)
+        logger.info(f"Scanned {self.cwd}: {len(rel_paths)} files, {len(self.needs_index)} to index.")
+        self.status_label.setText(f"Status: {len(rel_paths)} files loaded from {self.cwd}, "
+                                  f"{len(self.needs_index)} new or changed.")
+
+    def on_scan_error(self, scan_id, error_message):
+        if scan_id != self.scan_id:
+            return
+        self.scanner = None
+        logger.error(error_message)
+        self.status_label.setText(f"Status: {error_message}")
         
     def handle_query(self):
         """Handle the query input asynchronously."""
@@ -276,41 +715,43 @@ class MainWindow(QMainWindow):
             self.status_label.setText("Status: Please enter a query.")
             return
 
-        if not self.parsed_doc:
+        if not self.parsed_doc or self.doc_index is None:
             self.status_label.setText("Status: No parsed document available.")
             return
 
-        # Gather context from the parsed document
-        context = []
-        for section in self.parsed_doc.chunks():
-            context.append([sentence for sentence in section.sentences])
-        context = sum(context, [])
-
-        # Disable the button to prevent multiple clicks
-        self.query_btn.setEnabled(False)
-        self.summarize_btn.setEnabled(False)
         self.status_label.setText("Status: Processing query...")
 
-        # Create and start the worker thread, optional arguments define the query job run:
+        # Queue the query ahead of background work, optional arguments define the query job run:
         # 1. top n results order by similarity
         # 2. document filtered by query and similarity in the order it appears in the document.
-        self.query_worker = QueryWorker(query, context, self.qa_response, self.n_results)
+        # There is one response pane, so a newer query supersedes one that is still running.
+        self.query_worker = QueryWorker(query, self.doc_index, self.qa_response, self.n_results,
+                                        self.doc_model.document_id)
         self.query_worker.finished.connect(self.on_query_complete)
         self.query_worker.error.connect(self.on_query_error)
-        self.query_worker.start()
+        scheduler.submit(self.query_worker.run, priority=PRIORITY_INTERACTIVE, key="query")
 
     def on_query_complete(self, response):
         """Handle the completion of the query."""
+        # the response box now holds a new response, a summary of the old one is stale
+        scheduler.cancel("summarize")
         self.summary_out_put.setText(response)
         self.status_label.setText("Status: Query processed successfully.")
-        self.query_btn.setEnabled(True)
-        self.summarize_btn.setEnabled(True)
 
     def on_query_error(self, error_message):
         """Handle errors during query processing."""
         self.status_label.setText(error_message)
-        self.query_btn.setEnabled(True)
-        self.summarize_btn.setEnabled(True)
+
+    def cancel_jobs(self):
+        """Cancel the running parse, query and summarization."""
+        logger.info("clicked signal: cancel_jobs")
+        scheduler.cancel("parse")
+        if self.requested_path:
+            scheduler.cancel(f"prefetch:{self.requested_path}")
+        scheduler.cancel("query")
+        scheduler.cancel("summarize")
+        scheduler.cancel("doc_summary")
+        self.status_label.setText("Status: Cancelled.")
         
     def summarize_response(self):
         """Summarize the response output asynchronously."""
@@ -320,29 +761,56 @@ class MainWindow(QMainWindow):
             self.status_label.setText("Status: No response to summarize.")
             return
 
-        # Disable the button to prevent multiple clicks
-        self.summarize_btn.setEnabled(False)
-        self.query_btn.setEnabled(False)
         self.status_label.setText("Status: Summarizing...")
 
-        # Create and start the worker thread
-        self.worker = SummarizationWorker(response)
+        # Summarization runs as background work so queries can still jump ahead of it
+        self.summary_out_put.setText("Summary:")
+        self.worker = SummarizationWorker(response, self.latency_budget,
+                                          self.doc_model.document_id if self.doc_model else None)
+        self.worker.partial.connect(self.on_summary_partial)
         self.worker.finished.connect(self.on_summarization_complete)
         self.worker.error.connect(self.on_summarization_error)
-        self.worker.start()
+        scheduler.submit(self.worker.run, priority=PRIORITY_BACKGROUND, key="summarize")
+
+    def summarize_document(self):
+        """Summarize the whole parsed document into a brief asynchronously."""
+        logger.info("clicked signal: summarize_document")
+        if not self.parsed_doc:
+            self.status_label.setText("Status: No parsed document available.")
+            return
+        self.status_label.setText("Status: Summarizing document...")
+        self.doc_summary_worker = DocumentSummaryWorker(self.doc_model, self.doc_model.document_id)
+        self.doc_summary_worker.finished.connect(self.on_document_summary_complete)
+        self.doc_summary_worker.error.connect(self.on_summarization_error)
+        # its own key, so summarizing a query response does not cancel the document brief
+        scheduler.submit(self.doc_summary_worker.run, priority=PRIORITY_BACKGROUND, key="doc_summary")
+
+    def on_document_summary_complete(self, summary):
+        """Show the document brief."""
+        self.summary_out_put.setText(f"Document Summary:\n{summary}")
+        self.status_label.setText("Status: Document summarized successfully.")
+
+    def on_summary_partial(self, index, total, summary):
+        """Append each chunk summary as soon as it arrives."""
+        self.summary_out_put.append(summary)
+        self.status_label.setText(f"Status: Summarizing... chunk {index + 1} of {total}")
 
     def on_summarization_complete(self, summary):
         """Handle the completion of the summarization."""
-        self.summary_out_put.setText(f"Summary:\n{summary}")
+        # the chunk summaries were already appended as they arrived
+        if not summary:
+            self.summary_out_put.setText("Summary:\nNo summary available.")
         self.status_label.setText("Status: Response summarized successfully.")
-        self.summarize_btn.setEnabled(True)
-        self.query_btn.setEnabled(True)
         
     def on_summarization_error(self, error_message):
         """Handle errors during summarization."""
         self.status_label.setText(error_message)
-        self.summarize_btn.setEnabled(True)
-        self.query_btn.setEnabled(True)
+
+    def closeEvent(self, event):
+        """Stop the background jobs when the window closes."""
+        self.rescan_timer.stop()
+        scheduler.shutdown()
+        super().closeEvent(event)
         
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,120 @@
+# load_test.py
+# drives a running query_server on localhost with concurrent clients and reports latency and batching
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "notebooks"))
+from run_benchmarks import CHECKLIST, percentile
+
+SAMPLE_TEXT = (
+    "The Contractor will be required to design, develop, or operate a system of records on individuals, to "
+    "accomplish an agency function subject to the Privacy Act of 1974. Violation of the Act may involve the "
+    "imposition of criminal penalties. Deliverables in this contract include the design, development, testing, "
+    "implementation and documentation tasks. The period of performance is twelve months from the date of award."
+)
+
+
+class Client:
+    """One keep-alive connection to the server."""
+
+    def __init__(self, host: str, port: int):
+        self.conn = http.client.HTTPConnection(host, port, timeout=600)
+
+    def call(self, method: str, path: str, body: dict = None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        self.conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+        response = self.conn.getresponse()
+        return response.status, json.loads(response.read())
+
+
+def document_sentences(pdf_path: str) -> list:
+    if not pdf_path:
+        return SAMPLE_TEXT.split(". ")
+    import chunkPDF
+    return chunkPDF.process_pdf(pdf_path)
+
+
+def run_clients(args, document_id: str) -> dict:
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker(n: int):
+        client = Client(args.host, args.port)
+        i = n
+        while time.perf_counter() < deadline:
+            if args.endpoint == "summarize":
+                body = {"text": f"{SAMPLE_TEXT} Request {i}.", "backend": args.backend}
+            else:
+                body = {"document_id": document_id, "query": CHECKLIST[i % len(CHECKLIST)], "mode": "top",
+                        "n_results": 3}
+            start = time.perf_counter()
+            try:
+                status, _ = client.call("POST", f"/{args.endpoint}", body)
+            except (OSError, http.client.HTTPException):
+                status = "connection error"
+                client = Client(args.host, args.port)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+            i += args.clients
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 95) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 99) * 1000 if latencies else None,
+        "statuses": {str(k): v for k, v in statuses.items()},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a running query_server.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--endpoint", choices=["query", "summarize"], default="query")
+    parser.add_argument("-c", "--clients", type=int, default=16, help="concurrent connections")
+    parser.add_argument("-d", "--duration", type=float, default=10, help="seconds to run")
+    parser.add_argument("--pdf", help="PDF to index for the query load, defaults to a short sample text")
+    parser.add_argument("--backend", default="extractive", help="summarizer backend for the summarize load")
+    parser.add_argument("-o", "--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    setup = Client(args.host, args.port)
+    document_id = "load-test"
+    if args.endpoint == "query":
+        status, response = setup.call("POST", "/index", {"document_id": document_id,
+                                                         "sentences": document_sentences(args.pdf)})
+        if status != 200:
+            sys.exit(f"Indexing failed: {response}")
+        print(f"Indexed {response['sentences']} sentences")
+    _, before = setup.call("GET", "/stats")
+    results = run_clients(args, document_id)
+    _, after = setup.call("GET", "/stats")
+    batcher = "encode" if args.endpoint == "query" else "summarize"
+    batches = after["batchers"][batcher]["batches"] - before["batchers"][batcher]["batches"]
+    items = after["batchers"][batcher]["items"] - before["batchers"][batcher]["items"]
+    results["batches"] = batches
+    results["mean_batch"] = items / batches if batches else None
+    results["rejected"] = after["rejected"] - before["rejected"]
+
+    for name, value in results.items():
+        print(f"{name:22s} {value}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
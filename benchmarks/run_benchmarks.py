@@ -0,0 +1,305 @@
+# run_benchmarks.py
+# end-to-end benchmarks over the ExampleRFPs corpus: ingest, llmsherpa replay, encode, query and summarize
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "notebooks"))
+logger = logging.getLogger(__name__)
+
+CHECKLIST = [
+    "What is the period of performance?",
+    "Where is the place of performance?",
+    "What security clearance is required?",
+    "Does the contractor need to comply with the Privacy Act?",
+    "What are the key personnel requirements?",
+    "What deliverables are required?",
+    "What reporting and meetings are required?",
+    "Is FedRAMP authorization required?",
+    "What is the contract type?",
+    "What Section 508 accessibility requirements apply?",
+]
+DOCX_TEXT_REGEX = re.compile(r"<w:t[^>]*>([^<]*)</w:t>")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, None where getrusage is unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def current_rss_mb():
+    """Resident set size of this process right now, None without psutil."""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def rss_delta_mb(before):
+    """Growth in resident memory since before, so each stage is charged only for what it added."""
+    after = current_rss_mb()
+    return None if before is None or after is None else after - before
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def docx_paragraphs(path: str) -> list:
+    """Paragraph text of a .docx file using only the standard library."""
+    with zipfile.ZipFile(path) as archive:
+        xml = archive.read("word/document.xml").decode("utf-8")
+    paragraphs = []
+    for paragraph in xml.split("</w:p>"):
+        text = "".join(DOCX_TEXT_REGEX.findall(paragraph)).strip()
+        if text:
+            paragraphs.append(text)
+    return paragraphs
+
+
+def find_files(directory: str, extensions: tuple) -> list:
+    return sorted(
+        os.path.join(root, name) for root, _, files in os.walk(directory)
+        for name in files if name.lower().endswith(extensions)
+    )
+
+
+def bench_ingest(pdfs: list, metrics: dict, corpus: dict):
+    """Time both chunkPDF ingest paths and keep the paragraphs for the later stages."""
+    from pypdf import PdfReader
+    import chunkPDF
+    rss_before = current_rss_mb()
+    pages = sum(len(PdfReader(path).pages) for path in pdfs)
+    modules = {"chunkPDF": chunkPDF}
+    try:
+        import chunkPDF_co
+        modules["chunkPDF_co"] = chunkPDF_co
+    except Exception as e:
+        logger.warning(f"Skipping chunkPDF_co ingest: {e}")
+    for name, module in modules.items():
+        start = time.perf_counter()
+        for path in pdfs:
+            try:
+                paragraphs = module.process_pdf(path)
+            except Exception as e:
+                logger.warning(f"{name} failed on {path}: {e}")
+                continue
+            if name == "chunkPDF":
+                corpus[path] = paragraphs
+        elapsed = time.perf_counter() - start
+        metrics[f"ingest.{name}.seconds"] = elapsed
+        metrics[f"ingest.{name}.pages_per_second"] = pages / elapsed if elapsed else 0.0
+        metrics[f"ingest.{name}.docs_per_second"] = len(pdfs) / elapsed if elapsed else 0.0
+    metrics["ingest.pages"] = pages
+    metrics["ingest.rss_delta_mb"] = rss_delta_mb(rss_before)
+
+
+def bench_sherpa_replay(pdfs: list, metrics: dict, synthetic: bool = False):
+    """Rebuild llmsherpa documents from recorded responses and flatten them like the app does.
+
+    The flattened sentences only feed this stage's own metrics. The query and summarize stages always
+    use the chunkPDF corpus, so their numbers compare across machines with and without recordings.
+    Synthetic recordings are not parser output, they are only replayed when synthetic is set.
+    """
+    import query_doc
+    from sherpa_stub import RecordedPDFReader
+    reader = RecordedPDFReader()
+    recorded = [path for path in pdfs if reader.has_recording(path) and (synthetic or not reader.is_synthetic(path))]
+    if not recorded:
+        logger.warning("No llmsherpa recordings found, run benchmarks/sherpa_stub.py against a server first.")
+        return
+    sentences = 0
+    start = time.perf_counter()
+    for path in recorded:
+        sentences += len(query_doc.flatten_chunks(reader.read_pdf(path)))
+    metrics["sherpa_replay.documents"] = len(recorded)
+    metrics["sherpa_replay.synthetic_documents"] = sum(reader.is_synthetic(path) for path in recorded)
+    metrics["sherpa_replay.sentences"] = sentences
+    metrics["sherpa_replay.seconds"] = time.perf_counter() - start
+
+
+def bench_query(corpus: dict, metrics: dict, repeats: int):
+    import query_doc
+    import sum_text
+    sentences_by_doc = {}
+    for path, paragraphs in corpus.items():
+        sentences_by_doc[path] = [s for p in paragraphs for s in sum_text.split_sentences(p)]
+    n_sentences = sum(len(s) for s in sentences_by_doc.values())
+    # load the model outside the timings and the memory delta
+    query_doc.get_model()
+    rss_before = current_rss_mb()
+
+    # one build_index call encodes one document's sentences, time each as a batch
+    indexes, encode_latencies = {}, []
+    for path, sentences in sentences_by_doc.items():
+        if sentences:
+            start = time.perf_counter()
+            indexes[path] = query_doc.build_index(sentences)
+            encode_latencies.append(time.perf_counter() - start)
+    elapsed = sum(encode_latencies)
+    metrics["encode.sentences"] = n_sentences
+    metrics["encode.seconds"] = elapsed
+    metrics["encode.sentences_per_second"] = n_sentences / elapsed if elapsed else 0.0
+    if encode_latencies:
+        metrics["encode.p50_ms"] = percentile(encode_latencies, 50) * 1000
+        metrics["encode.p95_ms"] = percentile(encode_latencies, 95) * 1000
+
+    # rebuilding hits the embedding cache that the first pass filled
+    start = time.perf_counter()
+    for sentences in sentences_by_doc.values():
+        if sentences:
+            query_doc.build_index(sentences)
+    metrics["encode.cached_seconds"] = time.perf_counter() - start
+
+    latencies = []
+    for index in indexes.values():
+        for _ in range(repeats):
+            for query in CHECKLIST:
+                start = time.perf_counter()
+                query_doc.query_document(query, index)
+                latencies.append(time.perf_counter() - start)
+    metrics["query.p50_ms"] = percentile(latencies, 50) * 1000
+    metrics["query.p95_ms"] = percentile(latencies, 95) * 1000
+
+    batch_latencies = []
+    for index in indexes.values():
+        for _ in range(repeats):
+            start = time.perf_counter()
+            query_doc.query_many(CHECKLIST, index, mode="top", n_results=5)
+            batch_latencies.append(time.perf_counter() - start)
+    metrics["query_many.p50_ms"] = percentile(batch_latencies, 50) * 1000
+    metrics["query_many.p95_ms"] = percentile(batch_latencies, 95) * 1000
+    metrics["query.rss_delta_mb"] = rss_delta_mb(rss_before)
+
+
+def bench_summarize(corpus: dict, metrics: dict, n_chunks: int, backend: str):
+    import sum_text
+    text = "\n".join(p for paragraphs in corpus.values() for p in paragraphs)
+    chunks, lengths = sum_text.pack_chunks(text, return_lengths=True)
+    chunks, lengths = chunks[:n_chunks], lengths[:n_chunks]
+    # load the model outside the timings and the memory delta
+    sum_text.get_backend(backend).load()
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    sum_text.summarize_chunks(chunks, lengths, use_cache=False, backend=backend)
+    elapsed = time.perf_counter() - start
+    metrics[f"summarize.{backend}.chunks"] = len(chunks)
+    metrics[f"summarize.{backend}.seconds"] = elapsed
+    metrics[f"summarize.{backend}.tokens_per_second"] = sum(lengths) / elapsed if elapsed else 0.0
+    metrics["summarize.rss_delta_mb"] = rss_delta_mb(rss_before)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def is_higher_better(metric: str) -> bool:
+    return metric.endswith("_per_second")
+
+
+def is_compared(metric: str) -> bool:
+    return metric.endswith(("seconds", "_ms", "_per_second", "peak_rss_mb", "rss_delta_mb"))
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Return the metrics that got worse than the baseline by more than threshold (a fraction)."""
+    regressions = []
+    for metric, new in current["metrics"].items():
+        old = baseline["metrics"].get(metric)
+        # a stage that freed memory has a negative delta, there is no meaningful ratio against it
+        if not is_compared(metric) or old is None or old <= 0 or new is None:
+            continue
+        change = (new - old) / old
+        worse = change < -threshold if is_higher_better(metric) else change > threshold
+        if worse:
+            regressions.append({"metric": metric, "baseline": old, "current": new, "change": change})
+    return regressions
+
+
+def run(args) -> dict:
+    metrics = {}
+    corpus = {}
+    pdfs = find_files(args.corpus, (".pdf",))
+    docx = find_files(args.corpus, (".docx",))
+    bench_ingest(pdfs, metrics, corpus)
+    for path in docx:
+        corpus[path] = docx_paragraphs(path)
+    bench_sherpa_replay(pdfs, metrics, args.synthetic)
+    if not args.skip_query:
+        bench_query(corpus, metrics, args.repeats)
+    if not args.skip_summarize:
+        bench_summarize(corpus, metrics, args.summary_chunks, args.backend)
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "corpus": args.corpus,
+            "pdfs": len(pdfs),
+            "docx": len(docx),
+        },
+        "metrics": metrics,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Benchmark the RAG pipeline on the ExampleRFPs corpus.")
+    parser.add_argument("--corpus", default=os.path.join(ROOT, "ExampleRFPs"), help="directory of PDF and DOCX RFPs")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="where to write the results")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown as a fraction")
+    parser.add_argument("--repeats", type=int, default=3, help="times each query checklist is run per document")
+    parser.add_argument("--summary-chunks", type=int, default=4, help="chunks summarized in the summarize stage")
+    parser.add_argument("--backend", default="bart", help="summarizer backend for the summarize stage")
+    parser.add_argument("--skip-query", action="store_true", help="skip the encode and query stages")
+    parser.add_argument("--skip-summarize", action="store_true", help="skip the summarize stage")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="also replay recordings made with sherpa_stub.py --synthetic")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="use the app's embedding/summary caches instead of a fresh temporary one")
+    args = parser.parse_args()
+
+    if not args.warm_cache:
+        # must be set before query_doc and sum_text open their caches
+        os.environ["RAG_CACHE_DIR"] = tempfile.mkdtemp(prefix="rag_bench_")
+    results = run(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    for metric, value in sorted(results["metrics"].items()):
+        print(f"{metric:45s} {value if value is None else round(value, 3)}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} ({r['change']:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
@@ -0,0 +1,132 @@
+# check_quantization.py
+# compares the int8 inference backend against fp32 on the ExampleRFPs corpus: retrieval overlap, scores, latency, size
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import time
+import numpy as np
+import inference_backend
+import query_doc
+import sum_text
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "notebooks"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+import chunkPDF  # noqa: E402
+from run_benchmarks import CHECKLIST  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def corpus_sentences(directory: str, limit: int) -> list:
+    """Sentences of every PDF under directory, extracted offline with chunkPDF."""
+    sentences = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.lower().endswith(".pdf"):
+                continue
+            try:
+                paragraphs = chunkPDF.process_pdf(os.path.join(root, name))
+            except Exception as e:
+                logger.warning(f"Skipping {name}: {e}")
+                continue
+            for paragraph in paragraphs:
+                sentences.extend(sum_text.split_sentences(paragraph))
+    return sentences[:limit] if limit else sentences
+
+
+def serialized_size_mb(model) -> float:
+    """Size of the state dict on disk, which also counts packed int8 weights."""
+    import torch
+    buffer = io.BytesIO()
+    torch.save(getattr(model, "model", model).state_dict(), buffer)
+    return buffer.tell() / 2**20
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def compare_embeddings(sentences: list, queries: list, k: int) -> dict:
+    models = {
+        backend: inference_backend.load_sentence_transformer(query_doc.MODEL_NAME, backend)
+        for backend in inference_backend.BACKENDS
+    }
+    embeddings, latency = {}, {}
+    for backend, model in models.items():
+        embeddings[backend], latency[backend] = timed(
+            model.encode, sentences, normalize_embeddings=True, convert_to_numpy=True, batch_size=64)
+    fp32, int8 = embeddings[inference_backend.FP32], embeddings[inference_backend.INT8]
+    agreement = np.sum(fp32 * int8, axis=1)
+    q32 = models[inference_backend.FP32].encode(queries, normalize_embeddings=True)
+    q8 = models[inference_backend.INT8].encode(queries, normalize_embeddings=True)
+    s32, top32 = query_doc.top_k(q32 @ fp32.T, k)
+    s8, top8 = query_doc.top_k(q8 @ int8.T, k)
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(top32.tolist(), top8.tolist())]
+    return {
+        "sentences": len(sentences),
+        "embedding_cosine_mean": float(agreement.mean()),
+        "embedding_cosine_min": float(agreement.min()),
+        f"top{k}_overlap_mean": float(np.mean(overlap)),
+        f"top{k}_overlap_min": float(np.min(overlap)),
+        "top1_agreement": float(np.mean(top32[:, 0] == top8[:, 0])),
+        "top_score_abs_diff_mean": float(np.abs(s32 - s8).mean()),
+        "encode_seconds": latency,
+        "speedup": latency[inference_backend.FP32] / latency[inference_backend.INT8],
+        "size_mb": {b: serialized_size_mb(m) for b, m in models.items()},
+    }
+
+
+def unigram_f1(a: str, b: str) -> float:
+    a_words, b_words = set(a.lower().split()), set(b.lower().split())
+    if not a_words or not b_words:
+        return 0.0
+    common = len(a_words & b_words)
+    if not common:
+        return 0.0
+    precision, recall = common / len(b_words), common / len(a_words)
+    return 2 * precision * recall / (precision + recall)
+
+
+def compare_summaries(sentences: list, n_chunks: int) -> dict:
+    chunks = sum_text.pack_chunks(" ".join(sentences), tokenizer=inference_backend.load_tokenizer(
+        sum_text.SUMMARIZER_MODEL))[:n_chunks]
+    outputs, latency, sizes = {}, {}, {}
+    for backend in inference_backend.BACKENDS:
+        summarizer = inference_backend.load_summarization_pipeline(sum_text.SUMMARIZER_MODEL, backend)
+        sizes[backend] = serialized_size_mb(summarizer)
+        outputs[backend], latency[backend] = timed(summarizer, chunks, batch_size=1, **sum_text.GENERATION_KWARGS)
+        del summarizer
+    f1 = [unigram_f1(a["summary_text"], b["summary_text"])
+          for a, b in zip(outputs[inference_backend.FP32], outputs[inference_backend.INT8])]
+    return {
+        "chunks": len(chunks),
+        "summary_unigram_f1_mean": float(np.mean(f1)) if f1 else 0.0,
+        "summarize_seconds": latency,
+        "speedup": latency[inference_backend.FP32] / latency[inference_backend.INT8],
+        "size_mb": sizes,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Check int8 quantized models against fp32.")
+    parser.add_argument("--corpus", default="ExampleRFPs", help="directory of RFP PDFs")
+    parser.add_argument("--max-sentences", type=int, default=5000, help="cap on corpus sentences encoded")
+    parser.add_argument("-k", type=int, default=10, help="top k used for the overlap check")
+    parser.add_argument("--summary-chunks", type=int, default=4, help="chunks summarized by each backend, 0 skips")
+    parser.add_argument("-o", "--output", help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    sentences = corpus_sentences(args.corpus, args.max_sentences)
+    report = {"embedding": compare_embeddings(sentences, CHECKLIST, args.k)}
+    if args.summary_chunks:
+        report["summarization"] = compare_summaries(sentences, args.summary_chunks)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,241 @@
+# corpus_index.py
+# approximate nearest neighbour search over the sentences of every RFP in a directory
+import argparse
+import json
+import logging
+import os
+import time
+import numpy as np
+import query_doc
+import telemetry
+from directory_index import SUPPORTED_EXTENSIONS
+from document_model import section_of
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+llmsherpa_api_url = "http://localhost:5010/api/parseDocument?renderFormat=all"
+
+
+def collect_passages(parsed_doc) -> list:
+    """Return (section title, sentence) pairs for every sentence of an llmsherpa document, in document order."""
+    passages = []
+    for chunk in parsed_doc.chunks():
+        section = section_of(chunk)
+        title = section.title if section is not None else ""
+        passages.extend((title, sentence) for sentence in chunk.sentences)
+    return passages
+
+
+def kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 10, sample_size: int = 50_000,
+           seed: int = 0) -> np.ndarray:
+    """Spherical k-means on normalized vectors, returns unit length centroids."""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample_size:
+        vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignment = assign(vectors, centroids)
+        for c in range(n_clusters):
+            members = vectors[assignment == c]
+            if len(members):
+                centroid = members.sum(axis=0)
+                centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+            else:
+                # re-seed empty clusters so every list gets used
+                centroids[c] = vectors[rng.integers(len(vectors))]
+    return centroids
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 8192) -> np.ndarray:
+    """Return the index of the nearest centroid for each vector, in batches to bound memory."""
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), batch_size):
+        assignment[start:start + batch_size] = np.argmax(vectors[start:start + batch_size] @ centroids.T, axis=1)
+    return assignment
+
+
+class CorpusIndex:
+    """Inverted file (IVF) index over the sentence embeddings of a corpus of documents.
+
+    Sentences are clustered with k-means and stored grouped by cluster. A query is only scored against
+    the sentences of the n_probe clusters whose centroids are closest to it. A BM25 index over the same
+    sentences supplies exact term matches that are fused with the embedding hits.
+    """
+
+    def __init__(self, documents: list, locations: list, sentences: list, embeddings: np.ndarray,
+                 n_lists: int = None, lexical: LexicalIndex = None):
+        self.documents = documents      # document paths, referenced by position in locations
+        self.locations = locations      # (document id, section title, sentence position in document)
+        self.sentences = sentences
+        self.embeddings = embeddings.astype(np.float32)
+        self.centroids = None
+        self.order = None               # sentence ids grouped by cluster
+        self.offsets = None             # start of each cluster's ids in order, plus the end
+        self.lexical = lexical if lexical is not None else LexicalIndex.build(sentences)
+        self.train(n_lists)
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def train(self, n_lists: int = None):
+        """Cluster the embeddings and build the inverted lists."""
+        if not len(self):
+            self.centroids = np.empty((0, self.embeddings.shape[1]), dtype=np.float32)
+            self.order = np.empty(0, dtype=np.int64)
+            self.offsets = np.zeros(1, dtype=np.int64)
+            return
+        n_lists = n_lists or max(1, int(4 * np.sqrt(len(self))))
+        n_lists = min(n_lists, len(self))
+        start = time.perf_counter()
+        self.centroids = kmeans(self.embeddings, n_lists)
+        assignment = assign(self.embeddings, self.centroids)
+        self.order = np.argsort(assignment, kind="stable")
+        self.offsets = np.searchsorted(assignment[self.order], np.arange(n_lists + 1))
+        logger.info(f"Trained {n_lists} lists over {len(self)} sentences in {time.perf_counter() - start:.1f}s")
+
+    def _hits(self, scores: np.ndarray, ids: np.ndarray) -> list:
+        hits = []
+        for score, sid in zip(scores, ids):
+            doc_id, section, position = self.locations[sid]
+            hits.append({
+                "document": self.documents[doc_id],
+                "section": section,
+                "sentence": int(position),
+                "text": self.sentences[sid],
+                "score": float(score),
+            })
+        return hits
+
+    def search_ids(self, query_embeddings: np.ndarray, k: int = 10, n_probe: int = 8) -> tuple:
+        """Return (scores, sentence ids) of the approximate top k for each query embedding."""
+        n_probe = min(n_probe, len(self.centroids))
+        probes = query_doc.top_k(query_embeddings @ self.centroids.T, n_probe)[1]
+        all_scores, all_ids = [], []
+        for query_embedding, lists in zip(query_embeddings, probes):
+            candidates = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists])
+            if not len(candidates):
+                all_scores.append(np.empty(0, dtype=np.float32))
+                all_ids.append(np.empty(0, dtype=np.int64))
+                continue
+            scores, positions = query_doc.top_k((self.embeddings[candidates] @ query_embedding)[None, :], k)
+            all_scores.append(scores[0])
+            all_ids.append(candidates[positions[0]])
+        return all_scores, all_ids
+
+    def brute_force_ids(self, query_embeddings: np.ndarray, k: int = 10) -> tuple:
+        """Exact top k by scoring every sentence, used as the reference for recall."""
+        scores, ids = query_doc.top_k(query_embeddings @ self.embeddings.T, k)
+        return list(scores), list(ids)
+
+    def search(self, query: str, k: int = 10, n_probe: int = 8, hybrid: bool = True) -> list:
+        """Return the approximate top k hits with document, section and sentence locations.
+
+        With hybrid the embedding hits are fused with strong BM25 matches, scores stay cosine similarities.
+        """
+        if not len(self):
+            return []
+        query_embeddings = query_doc.encode([query])
+        if not hybrid or self.lexical is None:
+            scores, ids = self.search_ids(query_embeddings, k, n_probe)
+            return self._hits(scores[0], ids[0])
+        _, ids = self.search_ids(query_embeddings, max(k, query_doc.FUSION_DEPTH), n_probe)
+        lexical_scores, lexical_ids = self.lexical.search(query, query_doc.FUSION_DEPTH)
+        exact = lexical_ids[lexical_scores >= query_doc.LEXICAL_THRESHOLD]
+        ids = reciprocal_rank_fusion([ids[0], exact])[0][:k]
+        return self._hits(self.embeddings[ids] @ query_embeddings[0], ids)
+
+    def recall(self, queries: list, k: int = 10, n_probe: int = 8) -> float:
+        """Fraction of the exact top k that the approximate search also returns, averaged over queries."""
+        query_embeddings = query_doc.encode(queries)
+        _, approx = self.search_ids(query_embeddings, k, n_probe)
+        _, exact = self.brute_force_ids(query_embeddings, k)
+        overlaps = [len(set(a.tolist()) & set(e.tolist())) / max(len(e), 1) for a, e in zip(approx, exact)]
+        return float(np.mean(overlaps)) if overlaps else 0.0
+
+    def save(self, path: str):
+        """Write the index to path.npz, the lexical index to path.lexical.npz and the metadata to path.json."""
+        np.savez(f"{path}.npz", embeddings=self.embeddings, centroids=self.centroids,
+                 order=self.order, offsets=self.offsets)
+        with open(f"{path}.json", "w", encoding="utf-8") as f:
+            json.dump({"documents": self.documents, "locations": self.locations, "sentences": self.sentences}, f)
+        self.lexical.save(f"{path}.lexical")
+
+    @classmethod
+    def load(cls, path: str) -> "CorpusIndex":
+        """Read an index written by save without re-clustering."""
+        with open(f"{path}.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = np.load(f"{path}.npz")
+        index = cls.__new__(cls)
+        index.documents = meta["documents"]
+        index.locations = [tuple(loc) for loc in meta["locations"]]
+        index.sentences = meta["sentences"]
+        index.embeddings = arrays["embeddings"]
+        index.centroids = arrays["centroids"]
+        index.order = arrays["order"]
+        index.offsets = arrays["offsets"]
+        # indexes saved before the lexical index existed get one built on load
+        if os.path.exists(f"{path}.lexical.npz"):
+            index.lexical = LexicalIndex.load(f"{path}.lexical")
+        else:
+            index.lexical = LexicalIndex.build(index.sentences)
+        return index
+
+
+def find_documents(directory: str) -> list:
+    """Return every supported document under directory, sorted for a stable document order."""
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def build_corpus_index(directory: str, reader=None, n_lists: int = None) -> CorpusIndex:
+    """Parse every document under directory and index all of their sentences."""
+    if reader is None:
+        from parse_cache import CachedPDFReader
+        reader = CachedPDFReader(llmsherpa_api_url)
+    documents, locations, sentences = [], [], []
+    for path in find_documents(directory):
+        try:
+            parsed_doc = reader.read_pdf(path)
+        except Exception as e:
+            logger.error(f"Skipping {path}: {e}")
+            continue
+        doc_id = len(documents)
+        documents.append(path)
+        for position, (section, sentence) in enumerate(collect_passages(parsed_doc)):
+            locations.append((doc_id, section, position))
+            sentences.append(sentence)
+        logger.info(f"Collected {len(sentences)} sentences after {path}")
+    return CorpusIndex(documents, locations, sentences, query_doc.encode(sentences), n_lists)
+
+
+if __name__ == "__main__":
+    telemetry.configure_logging("corpus_index.log")
+    parser = argparse.ArgumentParser(description="Search every RFP in a directory.")
+    parser.add_argument("directory", help="directory of RFPs, e.g. ExampleRFPs/")
+    parser.add_argument("queries", nargs="+", help="queries to run across the corpus")
+    parser.add_argument("-k", type=int, default=10, help="number of hits per query")
+    parser.add_argument("--n-probe", type=int, default=8, help="number of clusters scored per query")
+    parser.add_argument("--index", help="path prefix to load the index from, or save it to after building")
+    parser.add_argument("--dense-only", action="store_true", help="skip fusing in the BM25 matches")
+    args = parser.parse_args()
+
+    if args.index and os.path.exists(f"{args.index}.npz"):
+        corpus = CorpusIndex.load(args.index)
+    else:
+        corpus = build_corpus_index(args.directory)
+        if args.index:
+            corpus.save(args.index)
+    for query in args.queries:
+        start = time.perf_counter()
+        hits = corpus.search(query, args.k, args.n_probe, hybrid=not args.dense_only)
+        print(f"Query: {query} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        for hit in hits:
+            print(f"  {hit['score']:.4f} {hit['document']} | {hit['section']} | sentence {hit['sentence']}")
+            print(f"    {hit['text']}")
+    print(f"Recall@{args.k} against brute force: {corpus.recall(args.queries, args.k, args.n_probe):.3f}")
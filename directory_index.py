@@ -0,0 +1,131 @@
+# directory_index.py
+# remembers which RFPs under a directory were indexed, so reopening a share only touches changed files
+import json
+import logging
+import os
+from disk_cache import DiskCache
+from parse_cache import file_hash
+import inference_backend
+import query_doc
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")  # both accepted by the llmsherpa parser
+SKIPPED_DIRECTORIES = {"__pycache__", ".git", ".rag_cache", "node_modules"}
+# bump when parsing, sentence splitting or indexing changes so every document gets indexed again
+INDEX_VERSION = 1
+
+NEW = "new"              # never indexed
+CHANGED = "changed"      # contents differ from the indexed version
+STALE = "stale"          # same contents, indexed by an older pipeline or never finished
+UNCHANGED = "unchanged"  # indexed with the current pipeline
+
+
+def index_version() -> str:
+    """Pipeline version stored with each indexed file, includes the embedding model and backend."""
+    return f"{INDEX_VERSION}/{inference_backend.model_id(query_doc.MODEL_NAME)}"
+
+
+def iter_files(directory: str, extensions: tuple = SUPPORTED_EXTENSIONS, directories: list = None):
+    """Yield (path, os.stat_result) for supported files under directory, one directory at a time.
+
+    Hidden and tool directories are skipped. Only directory entries are read, file contents are not.
+    Every directory visited is appended to directories if a list is given, e.g. to watch them.
+    """
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        if directories is not None:
+            directories.append(current)
+        try:
+            with os.scandir(current) as entries:
+                entries = sorted(entries, key=lambda e: e.name.lower())
+        except OSError as e:
+            logger.warning(f"Could not scan {current}: {e}")
+            continue
+        subdirectories = []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIPPED_DIRECTORIES:
+                        subdirectories.append(entry.path)
+                elif entry.name.lower().endswith(extensions) and entry.is_file():
+                    yield entry.path, entry.stat()
+            except OSError as e:
+                logger.warning(f"Could not stat {entry.path}: {e}")
+        # depth first in name order, so the list fills in the order a file browser shows it
+        pending.extend(reversed(subdirectories))
+
+
+class FileManifest:
+    """Size, mtime, content hash and index version of every file seen, keyed by absolute path.
+
+    Size and mtime decide whether a file needs hashing at all, so an unchanged file costs one stat.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.cache = DiskCache("file_manifest", max_entries=max_entries)
+        self.version = index_version()
+
+    def _get(self, path: str):
+        value = self.cache.get(path)
+        return json.loads(value) if value is not None else None
+
+    def _put(self, path: str, entry: dict):
+        self.cache.put(path, json.dumps(entry))
+
+    def check(self, path: str, stat: os.stat_result = None, has_parse=None) -> str:
+        """Return NEW, CHANGED, STALE or UNCHANGED for the file, hashing it only if its size or mtime moved.
+
+        has_parse(path, content_hash), e.g. CachedPDFReader.has, reports whether the parse is still cached.
+        A file whose parse was evicted is STALE, so it is parsed again instead of waiting on the parse service.
+        """
+        path = os.path.abspath(path)
+        stat = stat or os.stat(path)
+        entry = self._get(path)
+        if entry is None:
+            return NEW
+        if entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            content_hash = file_hash(path)
+            if content_hash != entry["hash"]:
+                return CHANGED
+            # touched or copied without changing the contents
+            self._put(path, {**entry, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+        if entry["index_version"] != self.version:
+            return STALE
+        if has_parse is not None and not has_parse(path, entry["hash"]):
+            return STALE
+        return UNCHANGED
+
+    def current_hash(self, path: str) -> str:
+        """Return the content hash of the file, from the manifest when its size and mtime still match."""
+        path = os.path.abspath(path)
+        entry = self._get(path)
+        stat = os.stat(path)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["hash"]
+        return file_hash(path)
+
+    def mark_indexed(self, path: str, content_hash: str, stat: os.stat_result = None):
+        """Record that the file with this content hash was parsed and indexed by the current pipeline.
+
+        Pass the stat taken before hashing, so an edit made since then is still seen as a change.
+        """
+        path = os.path.abspath(path)
+        stat = stat or os.stat(path)
+        self._put(path, {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": content_hash,
+                         "index_version": self.version})
+
+    def forget(self, path: str = None):
+        """Drop the entry of path, or every entry if no path is given."""
+        if path is None:
+            self.cache.clear()
+        else:
+            self.cache.delete(os.path.abspath(path))
+
+    def scan(self, directory: str, directories: list = None, has_parse=None):
+        """Yield (path, status) for every supported file under directory, has_parse as in check."""
+        for path, stat in iter_files(directory, directories=directories):
+            yield path, self.check(path, stat, has_parse)
@@ -0,0 +1,135 @@
+# disk_cache.py
+# a small size-bounded key/value store on disk, shared by the app modules so work survives restarts
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get("RAG_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rag_cache"))
+_caches = weakref.WeakSet()  # every open cache, for the diagnostics panel
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so the same sentence extracted from different layouts gets the same key."""
+    return " ".join(text.split())
+
+
+def text_hash(text: str) -> str:
+    """Return a stable content hash of the normalized text."""
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """SQLite backed key/value cache that evicts the least recently used entries past max_entries."""
+
+    def __init__(self, name: str, max_entries: int = 200_000, cache_dir: str = CACHE_DIR):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.name = name
+        self.path = os.path.join(cache_dir, f"{name}.sqlite")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._conn.commit()
+        _caches.add(self)
+
+    def get_many(self, keys: list) -> dict:
+        """Return a dict of the keys that are cached, refreshing their last used time."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            # sqlite limits the number of bound parameters, so look keys up in slices
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str):
+        """Return the cached value for key or None."""
+        return self.get_many([key]).get(key)
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether key is cached, without reading its value or refreshing its last used time."""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def put_many(self, items: dict):
+        """Store key/value pairs and evict the oldest entries if the cache is over its size bound."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, last_used) VALUES (?, ?, ?)",
+                [(k, v, now) for k, v in items.items()]
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                # drop an extra 10% so we are not evicting on every insert
+                n_evict = count - self.max_entries + self.max_entries // 10
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_used LIMIT ?)", (n_evict,)
+                )
+                logger.info(f"Evicted {n_evict} entries from {self.path}")
+            self._conn.commit()
+
+    def put(self, key: str, value):
+        """Store a single key/value pair."""
+        self.put_many({key: value})
+
+    def delete(self, key: str):
+        """Remove a single entry if it is cached."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> dict:
+        """Return the entry count and hit/miss counters since the cache was opened."""
+        lookups = self.hits + self.misses
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None}
+
+
+def cache_stats() -> dict:
+    """Return stats() for every open cache by name, caches sharing a name are combined."""
+    combined = {}
+    for cache in list(_caches):
+        stats = cache.stats()
+        if cache.name in combined:
+            total = combined[cache.name]
+            for field in ("hits", "misses"):
+                total[field] += stats[field]
+            lookups = total["hits"] + total["misses"]
+            total["hit_rate"] = total["hits"] / lookups if lookups else None
+        else:
+            combined[cache.name] = stats
+    return combined
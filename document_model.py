@@ -0,0 +1,80 @@
+# document_model.py
+# one pass over a parsed llmsherpa document into lookup tables, so the UI never re-walks the block tree
+import logging
+import numpy as np
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+
+def section_of(chunk):
+    """Return the closest llmsherpa section (header block) above a chunk, or None."""
+    for parent in reversed(chunk.parent_chain()):
+        if parent.tag == "header":
+            return parent
+    return None
+
+
+class DocumentModel:
+    """Sections and sentences of a parsed document, indexed once per parse.
+
+    Sections are numbered in document order. Sentences are kept in document order with the section
+    each belongs to, sentences above the first header get the id len(sections). The sentence ids of
+    section s are order[offsets[s]:offsets[s + 1]].
+    """
+
+    def __init__(self, parsed_doc, document_id: str = None):
+        self.parsed_doc = parsed_doc
+        self.document_id = document_id
+        with telemetry.span("document_model", document=document_id) as tags:
+            self.sections = parsed_doc.sections()
+            self.titles = [section.title for section in self.sections]
+            self.by_id = {section.block_idx: i for i, section in enumerate(self.sections)}
+            self.by_title = {}
+            for i, title in enumerate(self.titles):
+                # the first section wins when titles repeat, like the old linear scan
+                self.by_title.setdefault(title, i)
+            positions = {id(section): i for i, section in enumerate(self.sections)}
+            self.sentences, sentence_sections, chunk_texts = [], [], []
+            for chunk in parsed_doc.chunks():
+                section_id = positions.get(id(section_of(chunk)), self.no_section)
+                chunk_texts.append(chunk.to_context_text(include_section_info=False))
+                for sentence in chunk.sentences:
+                    self.sentences.append(sentence)
+                    sentence_sections.append(section_id)
+            self.chunk_texts = chunk_texts
+            self.sentence_sections = np.array(sentence_sections, dtype=np.int64)
+            self.order = np.argsort(self.sentence_sections, kind="stable")
+            self.offsets = np.searchsorted(self.sentence_sections[self.order], np.arange(self.no_section + 2))
+            tags.update(sections=len(self.sections), sentences=len(self.sentences))
+        self._section_text = {}
+
+    @property
+    def no_section(self) -> int:
+        return len(self.sections)
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def section_index(self, title: str):
+        """Return the position of the first section with this title, or None."""
+        return self.by_title.get(title)
+
+    def section_by_id(self, block_idx: int):
+        """Return the section whose header block has this llmsherpa block index, or None."""
+        i = self.by_id.get(block_idx)
+        return None if i is None else self.sections[i]
+
+    def section_sentences(self, i: int) -> list:
+        """Return the sentences that belong directly to section i, in document order."""
+        return [self.sentences[s] for s in np.sort(self.order[self.offsets[i]:self.offsets[i + 1]])]
+
+    def section_text(self, i: int) -> str:
+        """Return the paragraph text of section i, built on first use and then kept."""
+        if i not in self._section_text:
+            self._section_text[i] = "\n".join(p.to_text() for p in self.sections[i].paragraphs())
+        return self._section_text[i]
+
+    def section_context(self, i: int) -> str:
+        """Return the parent headers and title of section i, as llmsherpa's to_context_text gives them."""
+        return self.sections[i].to_context_text(include_section_info=True)
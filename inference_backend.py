@@ -0,0 +1,60 @@
+# inference_backend.py
+# selects how the embedding and summarization models run on CPU: full fp32 weights or int8 dynamic quantization
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+FP32 = "fp32"
+INT8 = "int8"
+BACKENDS = (FP32, INT8)
+
+# RAG_INFERENCE_BACKEND=int8 serves both models with int8 dynamic quantization of their linear layers
+BACKEND = os.environ.get("RAG_INFERENCE_BACKEND", FP32).lower()
+# RAG_OFFLINE=1 only loads weights already in the local Hugging Face cache, never the network
+OFFLINE = os.environ.get("RAG_OFFLINE", "0") == "1"
+
+if BACKEND not in BACKENDS:
+    raise ValueError(f"Unknown RAG_INFERENCE_BACKEND {BACKEND}, expected one of {BACKENDS}")
+
+
+def model_id(name: str, backend: str = None) -> str:
+    """Identifier used in cache keys, so outputs of different backends never mix."""
+    backend = backend or BACKEND
+    return name if backend == FP32 else f"{name}:{backend}"
+
+
+def quantize(module):
+    """Return the torch module with its Linear layers dynamically quantized to int8."""
+    import torch
+    module.eval()
+    return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_sentence_transformer(name: str, backend: str = None):
+    """Load a SentenceTransformer on the CPU with the selected backend."""
+    from sentence_transformers import SentenceTransformer
+    backend = backend or BACKEND
+    model = SentenceTransformer(name, device="cpu", local_files_only=OFFLINE)
+    if backend == INT8:
+        model = quantize(model)
+    logger.info(f"Loaded {name} with the {backend} backend{' (offline)' if OFFLINE else ''}")
+    return model
+
+
+def load_summarization_pipeline(name: str, backend: str = None):
+    """Load a transformers summarization pipeline on the CPU with the selected backend."""
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+    backend = backend or BACKEND
+    tokenizer = AutoTokenizer.from_pretrained(name, use_fast=True, local_files_only=OFFLINE)
+    model = AutoModelForSeq2SeqLM.from_pretrained(name, local_files_only=OFFLINE)
+    if backend == INT8:
+        model = quantize(model)
+    logger.info(f"Loaded {name} with the {backend} backend{' (offline)' if OFFLINE else ''}")
+    return pipeline("summarization", model=model, tokenizer=tokenizer, device=-1)
+
+
+def load_tokenizer(name: str):
+    """Load the fast tokenizer of a model, honouring offline mode."""
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(name, use_fast=True, local_files_only=OFFLINE)
@@ -0,0 +1,182 @@
+# job_scheduler.py
+# shared worker pool for the app's background work with priorities, coalescing and cooperative cancellation
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0   # queries the user is waiting on
+PRIORITY_FOREGROUND = 5    # long jobs the user is waiting on, like parsing a file, they never take the query worker
+PRIORITY_BACKGROUND = 10   # summarization, parsing, indexing
+PRIORITY_PREFETCH = 20     # speculative work nobody is waiting on yet
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when its cancellation token has been cancelled."""
+
+
+class CancellationToken:
+    """Flag shared between the scheduler and a running job, jobs poll it at safe points."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        """Raise JobCancelled if the job has been cancelled."""
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+class Job:
+    def __init__(self, fn, args, priority, key, on_result, on_error, on_cancel):
+        self.fn = fn
+        self.args = args
+        self.priority = priority
+        self.key = key
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.token = CancellationToken()
+        self.submitted = time.monotonic()
+
+    def cancel(self):
+        self.token.cancel()
+
+
+class JobScheduler:
+    """Bounded pool of worker threads that runs the most urgent job first.
+
+    Jobs are called as fn(token, *args). Submitting a job with the same key as a queued or running
+    job supersedes it. Jobs of any priority above PRIORITY_INTERACTIVE never take the last
+    reserved_interactive workers, so a query can always start even while long jobs are running.
+    """
+
+    def __init__(self, max_workers: int = 3, reserved_interactive: int = 1):
+        self.max_workers = max_workers
+        self.reserved_interactive = min(reserved_interactive, max_workers - 1)
+        self._heap = []
+        self._seq = itertools.count()
+        self._by_key = {}
+        self._running_background = 0
+        self._running = 0
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True) for i in range(max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn, *args, priority: int = PRIORITY_BACKGROUND, key=None, on_result=None, on_error=None,
+               on_cancel=None) -> Job:
+        """Queue fn(token, *args) and return its Job, superseding any job with the same key."""
+        job = Job(fn, args, priority, key, on_result, on_error, on_cancel)
+        with self._cond:
+            if key is not None:
+                previous = self._by_key.get(key)
+                if previous is not None:
+                    logger.info(f"Job {key} superseded by a newer submission")
+                    previous.cancel()
+                self._by_key[key] = job
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            self._cond.notify_all()
+        return job
+
+    def cancel(self, key):
+        """Cancel the queued or running job with this key."""
+        with self._cond:
+            job = self._by_key.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def promote(self, key, priority: int) -> bool:
+        """Raise the priority of the queued job with this key, returns False if it is not queued."""
+        with self._cond:
+            job = self._by_key.get(key)
+            for i, (queued_priority, seq, queued) in enumerate(self._heap):
+                if queued is job:
+                    job.priority = min(queued_priority, priority)
+                    self._heap[i] = (job.priority, seq, job)
+                    heapq.heapify(self._heap)
+                    self._cond.notify_all()
+                    return True
+        return False
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"queued": len(self._heap), "running": self._running, "workers": self.max_workers}
+
+    def shutdown(self):
+        """Cancel everything and stop the workers once their current jobs return."""
+        with self._cond:
+            self._shutdown = True
+            for _, _, job in self._heap:
+                job.cancel()
+            for job in self._by_key.values():
+                job.cancel()
+            self._heap.clear()
+            self._cond.notify_all()
+
+    def _next_job(self):
+        """Pop the most urgent job this worker may run, waiting if there is none."""
+        with self._cond:
+            while True:
+                if self._shutdown:
+                    return None
+                background_limit = self.max_workers - self.reserved_interactive
+                for entry in sorted(self._heap):
+                    priority, _, job = entry
+                    if priority > PRIORITY_INTERACTIVE and self._running_background >= background_limit:
+                        continue
+                    self._heap.remove(entry)
+                    heapq.heapify(self._heap)
+                    self._running += 1
+                    if priority > PRIORITY_INTERACTIVE:
+                        self._running_background += 1
+                    return job
+                self._cond.wait()
+
+    def _finish(self, job):
+        with self._cond:
+            self._running -= 1
+            if job.priority > PRIORITY_INTERACTIVE:
+                self._running_background -= 1
+            if job.key is not None and self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                job.token.check()
+                result = job.fn(job.token, *job.args)
+                # a job superseded while running should not report a stale result
+                job.token.check()
+                if job.on_result:
+                    job.on_result(result)
+            except JobCancelled:
+                if job.on_cancel:
+                    job.on_cancel()
+            except Exception as e:
+                logger.error(f"Job {job.key or job.fn.__name__} failed: {e}")
+                if job.on_error:
+                    job.on_error(e)
+            finally:
+                self._finish(job)
+
+
+# the app shares one scheduler so every kind of job competes for the same bounded pool
+scheduler = JobScheduler()
@@ -0,0 +1,157 @@
+# lexical_index.py
+# BM25 inverted index over sentences, catches clause numbers and acronyms that embeddings blur together
+import logging
+import math
+import re
+import time
+from array import array
+from collections import Counter
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+K1 = 1.2
+B = 0.75
+# clause numbers and part numbers stay whole: "52.224-3", "gs-35f-0119y"
+TOKEN_REGEX = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+STOPWORDS = frozenset("""a an and are as at be by for from has have in is it its of on or that the this to was were
+will with shall all any may must not no such than then there these they which who what when where how does do""".split())
+MAX_DF_FRACTION = 0.25  # terms in more sentences than this are skipped when rarer query terms exist
+RRF_K = 60
+
+
+def tokenize(text: str) -> list:
+    """Lowercase terms of text, compound tokens like "52.224-3" are kept whole and also split into parts."""
+    terms = []
+    for token in TOKEN_REGEX.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(part for part in re.split(r"[.\-/]", token) if part and part not in STOPWORDS)
+    return terms
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = RRF_K) -> tuple:
+    """Fuse ranked id arrays (best first) into one ranking, returns (ids, fused scores) best first."""
+    fused = {}
+    for ranking in rankings:
+        for rank, sid in enumerate(ranking):
+            fused[int(sid)] = fused.get(int(sid), 0.0) + 1.0 / (k + rank + 1)
+    if not fused:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    ids = np.fromiter(fused.keys(), dtype=np.int64, count=len(fused))
+    scores = np.fromiter(fused.values(), dtype=np.float32, count=len(fused))
+    order = np.argsort(-scores, kind="stable")
+    return ids[order], scores[order]
+
+
+class LexicalIndex:
+    """BM25 index with postings stored as flat numpy arrays (CSR layout).
+
+    The postings of term t are ids[offsets[t]:offsets[t + 1]] with matching term frequencies in tfs,
+    so a query only touches the postings of its own terms, not every sentence.
+    """
+
+    def __init__(self, terms: list, offsets: np.ndarray, ids: np.ndarray, tfs: np.ndarray, lengths: np.ndarray):
+        self.terms = terms
+        self.vocabulary = {term: t for t, term in enumerate(terms)}
+        self.offsets = offsets
+        self.ids = ids
+        self.tfs = tfs
+        self.lengths = lengths
+        self.avg_length = float(lengths.mean()) if len(lengths) else 1.0
+        df = np.diff(offsets)
+        self.idf = np.log1p((len(lengths) - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    @classmethod
+    def build(cls, sentences) -> "LexicalIndex":
+        """Index an iterable of sentences, sentence ids are their positions."""
+        start = time.perf_counter()
+        vocabulary = {}
+        # one (term, sentence, tf) row per distinct term of each sentence, grouped by term afterwards
+        term_col, sid_col, tf_col = array("I"), array("I"), array("H")
+        lengths = array("H")
+        for sid, sentence in enumerate(sentences):
+            counts = Counter(tokenize(sentence))
+            lengths.append(min(sum(counts.values()), 65535))
+            for term, tf in counts.items():
+                term_col.append(vocabulary.setdefault(term, len(vocabulary)))
+                sid_col.append(sid)
+                tf_col.append(min(tf, 65535))
+        term_col = np.frombuffer(term_col, dtype=np.uint32)
+        order = np.argsort(term_col, kind="stable")
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(term_col, minlength=len(vocabulary)))
+        ids = np.frombuffer(sid_col, dtype=np.uint32)[order]
+        tfs = np.frombuffer(tf_col, dtype=np.uint16)[order]
+        lengths = np.frombuffer(lengths, dtype=np.uint16).copy()
+        index = cls(list(vocabulary), offsets, ids, tfs, lengths)
+        logger.info(f"Built lexical index of {len(index)} sentences, {len(vocabulary)} terms, "
+                    f"{offsets[-1]} postings in {time.perf_counter() - start:.1f}s")
+        return index
+
+    def _missing_idf(self) -> float:
+        return math.log1p((len(self) + 0.5) / 0.5)
+
+    def search(self, query: str, k: int = 100) -> tuple:
+        """Return (scores, sentence ids) of the k best BM25 matches, best first.
+
+        Scores are divided by the summed idf of the query terms, so a sentence of average length that
+        contains every query term once scores about 1 and missing rare terms pull the score down.
+        """
+        query_terms = set(tokenize(query))
+        known = [self.vocabulary[term] for term in query_terms if term in self.vocabulary]
+        weight = sum(float(self.idf[t]) for t in known) + self._missing_idf() * (len(query_terms) - len(known))
+        rare = [t for t in known if self.offsets[t + 1] - self.offsets[t] <= MAX_DF_FRACTION * len(self)]
+        # very common terms touch most postings but barely change the ranking
+        known = rare or known
+        if not known or k <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        id_parts, score_parts = [], []
+        for t in known:
+            start, end = self.offsets[t], self.offsets[t + 1]
+            ids = self.ids[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            norm = K1 * (1 - B + B * self.lengths[ids] / self.avg_length)
+            score_parts.append(self.idf[t] * tf * (K1 + 1) / (tf + norm))
+            id_parts.append(ids)
+        ids = np.concatenate(id_parts).astype(np.int64)
+        scores = np.concatenate(score_parts)
+        if len(known) > 1:
+            ids, inverse = np.unique(ids, return_inverse=True)
+            scores = np.bincount(inverse, weights=scores)
+        scores = (scores / weight).astype(np.float32)
+        if k < len(ids):
+            best = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[best], scores[best]
+        order = np.argsort(-scores, kind="stable")
+        return scores[order], ids[order]
+
+    def save(self, path: str):
+        """Write the index to path.npz, ids are delta encoded per term so they compress well."""
+        deltas = self.ids.astype(np.int64)
+        deltas[1:] -= deltas[:-1].copy()
+        starts = self.offsets[:-1][np.diff(self.offsets) > 0]
+        deltas[starts] = self.ids[starts]
+        np.savez_compressed(
+            f"{path}.npz", terms=np.frombuffer("\n".join(self.terms).encode("utf-8"), dtype=np.uint8),
+            offsets=self.offsets, deltas=deltas.astype(np.uint32), tfs=self.tfs, lengths=self.lengths,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        """Read an index written by save."""
+        arrays = np.load(f"{path}.npz")
+        terms = arrays["terms"].tobytes().decode("utf-8")
+        offsets = arrays["offsets"]
+        ids = arrays["deltas"].astype(np.int64)
+        # undo the delta encoding with one cumulative sum, restarting at every term
+        restart = np.zeros(len(ids), dtype=np.int64)
+        starts = offsets[:-1][np.diff(offsets) > 0]
+        restart[starts[1:]] = np.cumsum(ids)[starts[1:] - 1]
+        ids = (np.cumsum(ids) - np.maximum.accumulate(restart)).astype(np.uint32)
+        return cls(terms.split("\n") if terms else [], offsets, ids, arrays["tfs"], arrays["lengths"])
@@ -0,0 +1,181 @@
+# model_manager.py
+# loads the app's models on first use, in the background if asked, and unloads them when idle
+import gc
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# unload a model after this many seconds without use, 0 disables idle eviction
+IDLE_TIMEOUT = float(os.environ.get("RAG_MODEL_IDLE_TIMEOUT", 15 * 60))
+# approximate upper bound on the memory held by loaded models, 0 disables the budget
+MEMORY_BUDGET_MB = float(os.environ.get("RAG_MODEL_MEMORY_MB", 0))
+
+UNLOADED = "unloaded"
+LOADING = "loading"
+READY = "ready"
+ERROR = "error"
+
+
+def estimate_size_mb(model) -> float:
+    """Estimate the memory held by a torch model, sentence transformer or transformers pipeline."""
+    module = getattr(model, "model", model)  # pipelines keep the torch module on .model
+    parameters = getattr(module, "parameters", None)
+    if parameters is None:
+        return 0.0
+    try:
+        return sum(p.numel() * p.element_size() for p in parameters()) / 2**20
+    except Exception:
+        return 0.0
+
+
+class _Entry:
+    def __init__(self, loader):
+        self.loader = loader
+        self.model = None
+        self.status = UNLOADED
+        self.error = None
+        self.size_mb = 0.0
+        self.last_used = 0.0
+        self.lock = threading.Lock()
+
+
+class ModelManager:
+    """Registry of lazily loaded models with idle timeout and memory budget eviction."""
+
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT, memory_budget_mb: float = MEMORY_BUDGET_MB,
+                 check_interval: float = 30.0):
+        self.idle_timeout = idle_timeout
+        self.memory_budget_mb = memory_budget_mb
+        self.check_interval = check_interval
+        self._entries = {}
+        self._listeners = []
+        self._reaper = None
+
+    def register(self, name: str, loader):
+        """Register a zero-argument loader for a model name, nothing is loaded until the model is used."""
+        if name not in self._entries:
+            self._entries[name] = _Entry(loader)
+
+    def add_listener(self, callback):
+        """Call callback(name, status) whenever a model changes status."""
+        self._listeners.append(callback)
+
+    def _set_status(self, name, entry, status):
+        entry.status = status
+        for callback in self._listeners:
+            try:
+                callback(name, status)
+            except Exception as e:
+                logger.error(f"Model status listener failed: {e}")
+
+    def get(self, name: str):
+        """Return the model, loading it on this thread if it is not loaded yet."""
+        entry = self._entries[name]
+        entry.last_used = time.monotonic()
+        # read once, an unload on another thread may clear entry.model at any point
+        model = entry.model
+        if model is not None:
+            return model
+        with entry.lock:
+            # another thread may have finished loading while we waited on the lock
+            model = entry.model
+            loaded = model is None
+            if loaded:
+                model = self._load(name, entry)
+        entry.last_used = time.monotonic()
+        if loaded:
+            # outside entry.lock, unloading other models takes their locks
+            self._enforce_budget(keep=name)
+            self._start_reaper()
+        return model
+
+    def _load(self, name, entry):
+        self._set_status(name, entry, LOADING)
+        start = time.perf_counter()
+        try:
+            model = entry.loader()
+        except Exception as e:
+            entry.error = e
+            self._set_status(name, entry, ERROR)
+            logger.error(f"Failed to load model {name}: {e}")
+            raise
+        entry.model = model
+        entry.error = None
+        entry.size_mb = estimate_size_mb(model)
+        logger.info(f"Loaded model {name} ({entry.size_mb:.0f} MB) in {time.perf_counter() - start:.1f}s")
+        self._set_status(name, entry, READY)
+        return model
+
+    def preload(self, name: str) -> threading.Thread:
+        """Load the model on a background thread so it is ready by the time it is needed."""
+        def run():
+            try:
+                self.get(name)
+            except Exception:
+                pass  # already logged and reported through the status listeners
+        thread = threading.Thread(target=run, name=f"load-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def unload(self, name: str):
+        """Drop our reference to the model so its memory can be reclaimed."""
+        entry = self._entries[name]
+        with entry.lock:
+            if entry.model is None:
+                return
+            entry.model = None
+            entry.size_mb = 0.0
+        gc.collect()
+        logger.info(f"Unloaded model {name}")
+        self._set_status(name, entry, UNLOADED)
+
+    def status(self, name: str) -> str:
+        return self._entries[name].status
+
+    def statuses(self) -> dict:
+        return {name: entry.status for name, entry in self._entries.items()}
+
+    def loaded_size_mb(self) -> float:
+        return sum(entry.size_mb for entry in self._entries.values() if entry.model is not None)
+
+    def evict_idle(self):
+        """Unload models that have not been used within the idle timeout."""
+        if not self.idle_timeout:
+            return
+        now = time.monotonic()
+        for name, entry in list(self._entries.items()):
+            if entry.model is not None and now - entry.last_used > self.idle_timeout:
+                logger.info(f"Model {name} idle for {now - entry.last_used:.0f}s")
+                self.unload(name)
+
+    def _enforce_budget(self, keep=None):
+        """Unload least recently used models until the loaded models fit in the memory budget."""
+        if not self.memory_budget_mb:
+            return
+        loaded = sorted(
+            (entry.last_used, name) for name, entry in self._entries.items()
+            if entry.model is not None and name != keep
+        )
+        for _, name in loaded:
+            if self.loaded_size_mb() <= self.memory_budget_mb:
+                break
+            logger.info(f"Model memory over budget of {self.memory_budget_mb:.0f} MB")
+            self.unload(name)
+
+    def _start_reaper(self):
+        if self._reaper is not None or not self.idle_timeout:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.check_interval)
+                self.evict_idle()
+        self._reaper = threading.Thread(target=run, name="model-reaper", daemon=True)
+        self._reaper.start()
+
+
+# the app shares one manager so the budget covers every model
+manager = ModelManager()
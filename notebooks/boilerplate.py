@@ -0,0 +1,176 @@
+# boilerplate.py
+# a header/footer/page number model learned across the corpus instead of rediscovered per document
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+
+DIGITS_REGEX = re.compile(r'\d+')
+# normalized page number lines: "#", "page #", "page # of #", "# of #", "# | page", "- # -"
+PAGE_NUMBER_REGEX = re.compile(r'^(?:page )?#(?: (?:of|/) #)?$|^# ?\| ?page$|^- ?# ?-$')
+EDGE_LINES = 5          # lines at the top and bottom of a page that can be boilerplate
+MIN_PAGE_RATIO = 0.5    # a line is boilerplate in a document if it is on the edge of this share of its pages
+MIN_DOCUMENTS = 2       # a line is boilerplate for a template once this many documents agree
+MIN_SHARED_LINES = 2    # a document joins a template when they share this many header or footer lines
+MIN_SHARED_RATIO = 0.5  # and at least this share of the document's own boilerplate lines
+
+HEADER = 'header'
+FOOTER = 'footer'
+PAGE_NUMBER = 'page_number'
+
+
+def normalize_line(line:str) -> str:
+    """Lowercase, collapse whitespace and mask numbers so 'Page 3 of 40' and 'Page 4 of 40' match."""
+    return DIGITS_REGEX.sub('#', ' '.join(line.lower().split()))
+
+
+def fingerprint(line:str) -> str:
+    """Return a short stable fingerprint of the normalized line."""
+    return hashlib.blake2b(normalize_line(line).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def classify_line(line:str, position:str) -> str:
+    """Classify an edge line as PAGE_NUMBER, or as the HEADER or FOOTER its position says it is."""
+    return PAGE_NUMBER if PAGE_NUMBER_REGEX.match(normalize_line(line)) else position
+
+
+def edge_lines(page_text:str):
+    """Yield (position, line) for the non-empty lines at the top (HEADER) and bottom (FOOTER) of a page.
+
+    On a short page a line can be both near the top and near the bottom and is yielded for both.
+    """
+    lines = [line for line in page_text.splitlines() if line.strip()]
+    for line in lines[:EDGE_LINES]:
+        yield HEADER, line
+    for line in lines[max(0, len(lines) - EDGE_LINES):]:
+        yield FOOTER, line
+
+
+def edge_keys(page_text:str) -> set:
+    """Return the '<position>:<fingerprint>' keys of the header and footer lines of a page."""
+    keys = set()
+    for position, line in edge_lines(page_text):
+        if classify_line(line, position) != PAGE_NUMBER:
+            keys.add(f'{position}:{fingerprint(line)}')
+    return keys
+
+
+def document_boilerplate(page_texts:list[str]) -> dict:
+    """Return {key: number of pages} for header and footer lines repeated on at least MIN_PAGE_RATIO of the pages."""
+    counts = Counter()
+    for page_text in page_texts:
+        # count each key once per page
+        counts.update(edge_keys(page_text))
+    threshold = max(2, MIN_PAGE_RATIO * len(page_texts))
+    return {key: n for key, n in counts.items() if n >= threshold}
+
+
+class BoilerplateModel:
+    """Persisted header and footer fingerprints with document frequencies, per template, learned incrementally.
+
+    A template groups the documents of one issuer. Documents are matched to it by the header and footer
+    lines they share, such as the agency name, rather than by anything specific to one document.
+    """
+
+    def __init__(self, path:str = None):
+        self.path = path
+        # template -> {"documents": n, "lines": {key: number of documents it was boilerplate in}}
+        self.templates = {}
+        # (template, keys) of the most recent document learned, so ingest workers can report it
+        self.last_document = None
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.templates = json.load(f)
+
+    def save(self, path:str = None):
+        path = path or self.path
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.templates, f)
+
+    def match_template(self, doc_boilerplate:dict) -> str:
+        """Return the template sharing the most boilerplate lines with the document, or a new template key.
+
+        One common line such as "UNCLASSIFIED" is not enough, the document must share MIN_SHARED_LINES
+        lines and MIN_SHARED_RATIO of its own, so unrelated issuers do not merge into one template.
+        """
+        keys = set(doc_boilerplate)
+        best, best_shared = None, 0
+        for template, entry in self.templates.items():
+            shared = len(keys & entry['lines'].keys())
+            if shared > best_shared:
+                best, best_shared = template, shared
+        if best_shared >= max(MIN_SHARED_LINES, MIN_SHARED_RATIO * len(keys)):
+            return best
+        if not keys:
+            return 'default'
+        return hashlib.blake2b('\n'.join(sorted(keys)).encode('utf-8'), digest_size=8).hexdigest()
+
+    def add_document(self, template:str, doc_boilerplate:dict):
+        """Fold the boilerplate found in one document into the template's frequencies.
+
+        Pass template=None to file the document under the template it shares the most lines with.
+        """
+        template = template or self.match_template(doc_boilerplate)
+        entry = self.templates.setdefault(template, {'documents': 0, 'lines': {}})
+        entry['documents'] += 1
+        lines = entry['lines']
+        for key in doc_boilerplate:
+            lines[key] = lines.get(key, 0) + 1
+        return template
+
+    def learn(self, page_texts:list[str], template:str = None) -> dict:
+        """Learn from one document and return its own boilerplate keys."""
+        doc_boilerplate = document_boilerplate(page_texts)
+        template = self.add_document(template, doc_boilerplate)
+        self.last_document = (template, doc_boilerplate)
+        return doc_boilerplate
+
+    def known_keys(self, template:str) -> set:
+        """Keys that enough documents of the template agree are boilerplate."""
+        entry = self.templates.get(template)
+        if not entry:
+            return set()
+        return {key for key, n in entry['lines'].items() if n >= MIN_DOCUMENTS}
+
+    def clean_page(self, page_text:str, boilerplate:set) -> str:
+        """Drop page numbers and known header and footer lines from the edges of a page in one pass.
+
+        Header keys only match the top EDGE_LINES non-empty lines and footer keys only the bottom ones,
+        so the same text in the body of the page is kept.
+        """
+        lines = page_text.split('\n')
+        non_empty = sum(1 for line in lines if line.strip())
+        kept, k = [], 0
+        for line in lines:
+            if not line.strip():
+                kept.append(line)
+                continue
+            positions = []
+            if k < EDGE_LINES:
+                positions.append(HEADER)
+            if k >= non_empty - EDGE_LINES:
+                positions.append(FOOTER)
+            k += 1
+            if positions:
+                if classify_line(line, positions[0]) == PAGE_NUMBER:
+                    continue
+                fp = fingerprint(line)
+                if any(f'{position}:{fp}' in boilerplate for position in positions):
+                    continue
+            kept.append(line)
+        return '\n'.join(kept)
+
+    def clean_pages(self, page_texts:list[str], template:str = None, learn:bool = False) -> list[str]:
+        """Remove headers, footers and page numbers known for the template or repeated within the document.
+
+        The model only changes when learn is set, cleaning alone leaves it as it was.
+        """
+        if learn:
+            doc_boilerplate = self.learn(page_texts, template)
+            template = self.last_document[0]
+        else:
+            doc_boilerplate = document_boilerplate(page_texts)
+            template = template or self.match_template(doc_boilerplate)
+        boilerplate = self.known_keys(template) | set(doc_boilerplate)
+        return [self.clean_page(page_text, boilerplate) for page_text in page_texts]
@@ -1,6 +1,7 @@
 from pypdf import PdfReader
 import re
-from collections import Counter
+from collections import Counter, deque
+from itertools import chain
 
 def load_pdf(file_path):
     """Load the PDF file and return the PdfReader object."""
@@ -18,7 +19,7 @@ def remove_headers_and_footers(page_texts:list[str]):
             first_lines.append(non_empty_lines[:5])
     
     # Find common lines that appear
-    common_lines = Counter(sum(first_lines, [])).most_common(4)
+    common_lines = Counter(chain.from_iterable(first_lines)).most_common(4)
     
     # Filter out lines that appear less then len(page_texts) - 2 times
     # title pages and final pages frequently dont have headers/footers, so we allow for some leniency
@@ -37,8 +38,8 @@ def remove_headers_and_footers(page_texts:list[str]):
         cleaned_pages.append(cleaned_text)
     return cleaned_pages
 
-def remove_pg_numbers(page_text:list[str]):
-    """Remove page numbers from the text."""
+def page_number_patterns(sample_page:str):
+    """Pick the page number patterns that match a sample page."""
     patterns = [
         # Matches "Page X of Y"
         r'\bPage\s+\d+\s+of\s+\d+\b',  
@@ -47,28 +48,36 @@ def remove_pg_numbers(page_text:list[str]):
         # Matches "Page X"
         r'\bPage\s+\d+\b'    
     ]
-    possible_matches = filter(lambda p: re.search(p, page_text[-1], re.IGNORECASE), patterns)
+    possible_matches = filter(lambda p: re.search(p, sample_page, re.IGNORECASE), patterns)
     possible_matches = list(possible_matches)
     if not possible_matches:
         stand_alone_pgn = r'(?<!\d)\s*\d+\s*(?=\n|$)'
         possible_matches = [stand_alone_pgn]  # Fallback to standalone page numbers if no other patterns match
+    return possible_matches
+
+def remove_pg_numbers(page_text:list[str]):
+    """Remove page numbers from the text."""
+    possible_matches = page_number_patterns(page_text[-1])
+    # one combined pattern so each page is scanned once
+    page_number_regex = re.compile('|'.join(possible_matches), re.IGNORECASE)
     
     cleaned_pages = []
     for page in page_text:
-    # we are looking at a single page text, figure which pattern to use with a match
-        for pattern in possible_matches:
-            page = re.sub(pattern, '', page, flags=re.IGNORECASE)
-        cleaned_pages.append(page)
+        cleaned_pages.append(page_number_regex.sub('', page))
     return cleaned_pages
     
-def extract_text_from_pdf(pdf_reader:PdfReader):
+def extract_text_from_pdf(pdf_reader:PdfReader, boilerplate_model=None, template:str=None, learn:bool=False):
     """Extract text from all pages of the PDF."""
     proposal_content = []
     for page in pdf_reader.pages:
         proposal_content.append(page.extract_text())
     # remove headers and footers if necessary
-    proposal_content = remove_pg_numbers(proposal_content)
-    proposal_content = remove_headers_and_footers(proposal_content)
+    if boilerplate_model is not None:
+        # corpus learned fingerprints, one pass per page, the document is added to the model if learn is set
+        proposal_content = boilerplate_model.clean_pages(proposal_content, template, learn)
+    else:
+        proposal_content = remove_pg_numbers(proposal_content)
+        proposal_content = remove_headers_and_footers(proposal_content)
     if not proposal_content:
         raise ValueError("Failed to extract text from the PDF or the PDF is empty.")
     return "".join(proposal_content)
@@ -82,10 +91,69 @@ def filter_short_paragraphs(paragraphs:list[str], word_threshold=1):
     """Filter out paragraphs that are too short."""
     return [p for p in paragraphs if len(p.split(" ")) > word_threshold]
 
-def process_pdf(file_path:str):
+def iter_page_texts(pdf_reader:PdfReader):
+    """Yield the text of each page as it is read."""
+    for page in pdf_reader.pages:
+        yield page.extract_text() or ""
+
+def clean_window(pages:list[str], boilerplate_model=None, template:str=None):
+    """Remove page numbers, headers and footers from a run of pages, same steps as extract_text_from_pdf."""
+    if boilerplate_model is not None:
+        # a window is only part of a document, so it is cleaned with the model but not learned from
+        return boilerplate_model.clean_pages(pages, template, learn=False)
+    return remove_headers_and_footers(remove_pg_numbers(pages))
+
+def iter_clean_pages(page_texts, window:int=8, boilerplate_model=None, template:str=None):
+    """Yield pages with page numbers, headers and footers removed, holding at most window pages.
+
+    Boilerplate is detected over a full window of pages instead of the whole document. Each page is
+    cleaned with the window it starts, and the last window - 1 pages are cleaned together with the
+    final full window, so detection never runs over fewer pages than the document allows.
+    """
+    pending = deque(maxlen=window)
+    for page_text in page_texts:
+        pending.append(page_text)
+        if len(pending) == window:
+            # the oldest page is yielded now but stays in the window as look-behind for the last pages
+            yield clean_window(list(pending), boilerplate_model, template)[0]
+    pages = list(pending)
+    if not pages:
+        return
+    # documents shorter than the window never filled it, so all their pages are still pending
+    start = 1 if len(pages) == window else 0
+    yield from clean_window(pages, boilerplate_model, template)[start:]
+
+def iter_paragraphs(pages, word_threshold=1, max_carry:int=20000):
+    """Yield paragraphs from a stream of cleaned pages, carrying a paragraph across page breaks.
+
+    A paragraph still open after max_carry characters is yielded at the next page break, so a document
+    without paragraph breaks is not held in memory and re-split on every page.
+    """
+    carry = ''
+    for page in pages:
+        parts = (carry + page).split('\n ')
+        carry = parts.pop()
+        if len(carry) > max_carry:
+            parts.append(carry)
+            carry = ''
+        for p in filter_short_paragraphs([p.strip() for p in parts], word_threshold):
+            yield p
+    for p in filter_short_paragraphs([carry.strip()], word_threshold):
+        yield p
+
+def stream_pdf(file_path:str, window:int=8, boilerplate_model=None, template:str=None, max_carry:int=20000):
+    """Yield valid paragraphs of the PDF as its pages are read, with memory bounded by the window size.
+
+    boilerplate_model and template clean pages as in process_pdf, max_carry bounds an unbroken paragraph.
+    """
+    pdf_reader = load_pdf(file_path)
+    pages = iter_clean_pages(iter_page_texts(pdf_reader), window, boilerplate_model, template)
+    yield from iter_paragraphs(pages, max_carry=max_carry)
+
+def process_pdf(file_path:str, boilerplate_model=None, template:str=None, learn:bool=False):
     """Process the PDF and return valid paragraphs."""
     pdf_reader = load_pdf(file_path)
-    content = extract_text_from_pdf(pdf_reader)
+    content = extract_text_from_pdf(pdf_reader, boilerplate_model, template, learn)
     paragraphs = split_into_paragraphs(content)
     # if len(paragraphs) <= 4:
     #     # we have a badly formatted PDF with no logical text breaks.
@@ -8,8 +8,57 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 logger.info("Starting PDF text extraction and processing.")
 
-# Load spaCy language model
-nlp = spacy.load("en_core_web_sm")
+# Sentence segmentation settings, only the components needed for sentence boundaries are loaded
+SPACY_MODEL = "en_core_web_sm"
+NON_SENTENCE_PIPES = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"]
+SEGMENT_BATCH_SIZE = 64
+SEGMENT_PROCESSES = 1
+MAX_CARRY_CHARS = 10000  # a sentence this long is not carried into the next page, it is kept as is
+_sentence_nlp = None
+
+def get_sentence_nlp():
+    """Load spaCy with only the statistical sentence recognizer (senter) enabled."""
+    global _sentence_nlp
+    if _sentence_nlp is None:
+        try:
+            _sentence_nlp = spacy.load(SPACY_MODEL, exclude=NON_SENTENCE_PIPES)
+            _sentence_nlp.enable_pipe("senter")
+        except (OSError, ValueError) as e:
+            # fall back to the rule based sentencizer if the trained senter is not available
+            logger.warning(f"Could not load {SPACY_MODEL} senter ({e}), using the rule based sentencizer.")
+            _sentence_nlp = spacy.blank("en")
+            _sentence_nlp.add_pipe("sentencizer")
+        logger.info(f"Sentence pipeline: {_sentence_nlp.pipe_names}")
+    return _sentence_nlp
+
+def segment_sentences(texts, batch_size=SEGMENT_BATCH_SIZE, n_process=SEGMENT_PROCESSES):
+    """Yield the list of sentences of each text, streaming the texts through nlp.pipe in batches."""
+    nlp = get_sentence_nlp()
+    for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+        yield [sent.text.strip() for sent in doc.sents if sent.text.strip()]
+
+def segment_pages(page_texts):
+    """Yield the sentences of consecutive pages, segmenting one page at a time.
+
+    The last sentence of each page is carried into the next page's text before it is segmented, so a
+    sentence cut by a page break comes out whole without segmenting the document as one text.
+    """
+    nlp = get_sentence_nlp()
+    carry = ""
+    for text in page_texts:
+        if carry:
+            text = carry + "\n" + text
+        sents = list(nlp(text).sents)
+        # carry the raw text from the last sentence on, whitespace included, as if the pages were joined
+        carry = text[sents[-1].start_char:] if sents else ""
+        for sent in sents[:-1]:
+            if sent.text.strip():
+                yield sent.text.strip()
+        if len(carry) > MAX_CARRY_CHARS:
+            yield carry.strip()
+            carry = ""
+    if carry.strip():
+        yield carry.strip()
 
 # Regex to match bullet points
 BULLET_REGEX = r"^\s*[\-\*\•]|\d+\.\s|\([a-zA-Z]\)\s"  # Matches bullets like *, -, •, 1., a)
@@ -65,50 +114,46 @@ def remove_headers_and_footers(page_texts):
         else:
             mod_text = cleaned_text
         cleaned_pages.append(mod_text)
-    cleaned_pages = nlp("\n".join(cleaned_pages))  # Process the cleaned text with spaCy
-    cleaned_pages = [sent.text.strip() for sent in cleaned_pages.sents if sent.text.strip()]
-    return cleaned_pages
-
-def extract_paragraphs_and_bullets(pdf_path):
-    logger.info(f"whitespace extraction failed for {pdf_path}, attempting to extract paragraphs and bullets.")
-    reader = PdfReader(pdf_path)
-    raw_text = ""
+    # segment page by page instead of one huge doc, so we never need to raise nlp.max_length
+    return list(segment_pages(cleaned_pages))
 
+def iter_lines(reader):
+    """Yield the lines of every page as it is read, with a blank line at each page break."""
     for page in reader.pages:
         text = page.extract_text()
         if text:
-            raw_text += "\n" + text  # Preserve line breaks
+            yield ""  # Preserve line breaks
+            yield from text.split("\n")
 
-    # Split text into lines
-    lines = raw_text.split("\n")
-    paragraphs = []
-    temp_para = ""
+def iter_raw_paragraphs(lines):
+    """Merge a stream of lines into paragraphs, yielding bullet points on their own."""
+    temp_para = []
 
-    for i, line in enumerate(lines):
+    for line in lines:
         line = line.strip()
 
         if not line:  # Empty line signals paragraph break
             if temp_para:
-                paragraphs.append(temp_para)
-                temp_para = ""
+                yield " ".join(temp_para)
+                temp_para = []
         elif is_bullet_point(line):  # Handle bullet points separately
             if temp_para:
-                paragraphs.append(temp_para)  # Store previous paragraph
-            paragraphs.append(line)  # Store bullet point separately
-            temp_para = ""  # Reset temp buffer
+                yield " ".join(temp_para)  # Store previous paragraph
+            yield line  # Store bullet point separately
+            temp_para = []  # Reset temp buffer
         else:
-            temp_para += " " + line if temp_para else line  # Merge into a paragraph
+            temp_para.append(line)  # Merge into a paragraph
 
     if temp_para:
-        paragraphs.append(temp_para)  # Append last paragraph if exists
+        yield " ".join(temp_para)  # Append last paragraph if exists
 
-    # Use spaCy to refine sentence chunking
-    refined_paragraphs = []
-    for para in paragraphs:
-        doc = nlp(para)
-        refined_paragraphs.append("\n".join([sent.text.strip() for sent in doc.sents if sent.text.strip()]))
+def extract_paragraphs_and_bullets(pdf_path, batch_size=SEGMENT_BATCH_SIZE, n_process=SEGMENT_PROCESSES):
+    logger.info(f"whitespace extraction failed for {pdf_path}, attempting to extract paragraphs and bullets.")
+    reader = PdfReader(pdf_path)
+    paragraphs = iter_raw_paragraphs(iter_lines(reader))
 
-    return refined_paragraphs
+    # Use spaCy to refine sentence chunking
+    return ["\n".join(sents) for sents in segment_sentences(paragraphs, batch_size, n_process)]
 
 def load_pdf(file_path):
     """Load the PDF file and return the PdfReader object."""
@@ -137,7 +182,7 @@ def filter_short_paragraphs(paragraphs, word_threshold=5):
     """Filter out paragraphs that are too short."""
     return [p for p in paragraphs if len(p.split(" ")) > word_threshold]
 
-def process_pdf(file_path):
+def process_pdf(file_path, batch_size=SEGMENT_BATCH_SIZE, n_process=SEGMENT_PROCESSES):
     """Process the PDF and return valid paragraphs."""
     pdf_reader = load_pdf(file_path)
     content = extract_text_from_pdf(pdf_reader)
@@ -147,7 +192,7 @@ def process_pdf(file_path):
     paragraphs = split_into_paragraphs(content)
     if len(paragraphs) <= 10:
         # Handle poorly formatted PDFs with no logical text breaks
-        paragraphs = extract_paragraphs_and_bullets(file_path)
+        paragraphs = extract_paragraphs_and_bullets(file_path, batch_size, n_process)
     
     filtered_paragraphs = filter_short_paragraphs(paragraphs)
     if not filtered_paragraphs:
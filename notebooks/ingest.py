@@ -0,0 +1,161 @@
+# ingest.py
+# headless batch ingestion: run process_pdf over a directory of RFPs in a process pool
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pypdf import PdfReader
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class IngestTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise IngestTimeout()
+
+
+def find_pdfs(directory: str) -> list:
+    """Return every PDF under directory, sorted so runs are reproducible."""
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+    return sorted(paths)
+
+
+def output_name(path: str, directory: str) -> str:
+    """Flatten the path relative to the input directory into a single output file name."""
+    relative = os.path.relpath(path, directory)
+    return relative.replace(os.sep, "__").rsplit(".", 1)[0] + ".json"
+
+
+def ingest_file(path: str, output_path: str, method: str = "basic", timeout: float = 0,
+                boilerplate_path: str = None) -> dict:
+    """Process one PDF in a worker process and write its paragraphs to output_path."""
+    # import the chunker inside the worker, chunkPDF_co loads spaCy at import time
+    if method == "co":
+        import chunkPDF_co as chunker
+    else:
+        import chunkPDF as chunker
+    record = {"source": path, "output": output_path, "status": "ok", "pages": 0, "paragraphs": 0,
+              "seconds": 0.0, "error": None}
+    start = time.perf_counter()
+    # SIGALRM interrupts a stuck parse inside the worker, it is not available on Windows
+    use_alarm = timeout and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        record["pages"] = len(PdfReader(path).pages)
+        if boilerplate_path and method == "basic":
+            # workers clean with a snapshot of the model and report what they learned back to the parent
+            from boilerplate import BoilerplateModel
+            model = BoilerplateModel(boilerplate_path)
+            paragraphs = chunker.process_pdf(path, boilerplate_model=model, learn=True)
+            template, doc_boilerplate = model.last_document
+            record["template"] = template
+            record["boilerplate"] = doc_boilerplate
+        else:
+            paragraphs = chunker.process_pdf(path)
+        record["paragraphs"] = len(paragraphs)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(paragraphs, f)
+    except IngestTimeout:
+        record["status"] = "timeout"
+        record["error"] = f"exceeded {timeout}s"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+def ingest_directory(directory: str, output_dir: str, workers: int = None, timeout: float = 0,
+                     method: str = "basic", skip_errors: bool = True, boilerplate_path: str = None) -> dict:
+    """Ingest every PDF under directory and write the per-document outputs and a manifest to output_dir."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = find_pdfs(directory)
+    workers = workers or os.cpu_count() or 1
+    if timeout and not hasattr(signal, "SIGALRM"):
+        logger.warning("Per-file timeouts are not supported on this platform and will be ignored.")
+    if boilerplate_path and method != "basic":
+        logger.warning("The boilerplate model is only used with the basic method.")
+    logger.info(f"Ingesting {len(paths)} PDFs from {directory} with {workers} workers.")
+    records = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(ingest_file, path, os.path.join(output_dir, output_name(path, directory)), method, timeout,
+                        boilerplate_path): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            if record["status"] == "ok":
+                logger.info(f"{record['source']}: {record['pages']} pages, {record['paragraphs']} paragraphs "
+                            f"in {record['seconds']:.2f}s")
+            else:
+                logger.error(f"{record['source']}: {record['status']} ({record['error']})")
+                if not skip_errors:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+    elapsed = time.perf_counter() - start
+    done = [r for r in records if r["status"] == "ok"]
+    if boilerplate_path and method == "basic":
+        # fold what every worker learned into the persisted model
+        from boilerplate import BoilerplateModel
+        model = BoilerplateModel(boilerplate_path)
+        for record in done:
+            # workers matched templates against a snapshot, match again so documents of one run can group
+            record.pop("template")
+            model.add_document(None, record.pop("boilerplate"))
+        model.save()
+        logger.info(f"Updated boilerplate model {boilerplate_path} with {len(done)} documents.")
+    pages = sum(r["pages"] for r in done)
+    manifest = {
+        "directory": directory,
+        "method": method,
+        "workers": workers,
+        "seconds": elapsed,
+        "documents": len(done),
+        "failed": len(records) - len(done),
+        "pages": pages,
+        "docs_per_second": len(done) / elapsed if elapsed else 0.0,
+        "pages_per_second": pages / elapsed if elapsed else 0.0,
+        "files": sorted(records, key=lambda r: r["source"]),
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract paragraphs from every PDF in a directory.")
+    parser.add_argument("directory", help="directory of RFP PDFs, searched recursively")
+    parser.add_argument("-o", "--output", default="ingest_output", help="directory for paragraph JSON and manifest")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: cpu count)")
+    parser.add_argument("-t", "--timeout", type=float, default=0, help="per-file timeout in seconds (0 = none)")
+    parser.add_argument("--method", choices=["basic", "co"], default="basic",
+                        help="basic uses chunkPDF, co uses the spaCy based chunkPDF_co")
+    parser.add_argument("--boilerplate", help="path of the learned boilerplate model to use and update")
+    parser.add_argument("--fail-fast", action="store_true", help="stop at the first file that fails")
+    args = parser.parse_args()
+
+    manifest = ingest_directory(args.directory, args.output, args.workers, args.timeout, args.method,
+                                skip_errors=not args.fail_fast, boilerplate_path=args.boilerplate)
+    print(f"{manifest['documents']} documents ({manifest['failed']} failed), {manifest['pages']} pages "
+          f"in {manifest['seconds']:.1f}s")
+    print(f"{manifest['docs_per_second']:.2f} docs/s, {manifest['pages_per_second']:.2f} pages/s")
+    sys.exit(1 if manifest["failed"] and args.fail_fast else 0)
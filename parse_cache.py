@@ -0,0 +1,70 @@
+# parse_cache.py
+# keeps llmsherpa parse results on disk so re-opening an unchanged PDF skips the parse service
+import hashlib
+import json
+import logging
+import os
+import zlib
+from llmsherpa.readers import Document, LayoutPDFReader
+from disk_cache import DiskCache
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(path: str) -> str:
+    """Return the sha256 of the file contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CachedPDFReader:
+    """Drop-in LayoutPDFReader that caches the parsed blocks by file content hash and parser URL."""
+
+    def __init__(self, parser_api_url: str, max_entries: int = 500):
+        self.parser_api_url = parser_api_url
+        self.reader = LayoutPDFReader(parser_api_url)
+        self.cache = DiskCache("parsed_docs", max_entries=max_entries)
+
+    def cache_key(self, path: str, content_hash: str = None) -> str:
+        return f"{self.parser_api_url}:{content_hash or file_hash(path)}"
+
+    def has(self, path: str, content_hash: str = None) -> bool:
+        """Return whether the parse of the file is still cached, it may have been evicted since it was read."""
+        return self.cache_key(path, content_hash) in self.cache
+
+    def read_pdf(self, path: str, refresh: bool = False, content_hash: str = None) -> Document:
+        """Return the parsed document, only calling the parse service on a cache miss or refresh.
+
+        content_hash skips hashing the file when the caller already knows it, e.g. from a FileManifest.
+        """
+        with telemetry.span("parse", document=os.path.basename(path)) as tags:
+            if not os.path.isfile(path):
+                # urls and raw contents can not be hashed up front, so pass them straight through
+                tags["cached"] = False
+                return self.reader.read_pdf(path)
+            key = self.cache_key(path, content_hash)
+            if not refresh:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    tags["cached"] = True
+                    logger.info(f"Loaded parsed document from cache: {path}")
+                    return Document(json.loads(zlib.decompress(cached)))
+            tags["cached"] = False
+            doc = self.reader.read_pdf(path)
+            if doc and doc.json:
+                self.cache.put(key, zlib.compress(json.dumps(doc.json).encode("utf-8")))
+                logger.info(f"Cached parsed document: {path}")
+            return doc
+
+    def invalidate(self, path: str = None):
+        """Drop the cached parse of path, or of every document if no path is given."""
+        if path is None:
+            self.cache.clear()
+            logger.info("Cleared parsed document cache.")
+        elif os.path.isfile(path):
+            self.cache.delete(self.cache_key(path))
+            logger.info(f"Invalidated parsed document cache for: {path}")
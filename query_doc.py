@@ -1,61 +1,330 @@
 # query_doc.py
 # this script is used to query the loaded documents that will sent to a summarization model
 import logging
-import sys
-from sentence_transformers import SentenceTransformer
-import torch
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("RAGapp.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+import numpy as np
+from disk_cache import DiskCache, text_hash
+from model_manager import manager
+import inference_backend
+import telemetry
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from document_model import DocumentModel
 logger = logging.getLogger(__name__)
-model = SentenceTransformer('all-MiniLM-L6-v2')
+MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DIM = 384
+
+
+def _load_model():
+    # loaded through the backend module so importing query_doc does not pull in torch
+    return inference_backend.load_sentence_transformer(MODEL_NAME)
+
+
+manager.register("embedding", _load_model)
+
+
+def get_model():
+    """Return the sentence embedding model, loading it on first use."""
+    return manager.get("embedding")
+
+# embeddings are shared across documents and sessions, boilerplate clauses only get encoded once
+embedding_cache = DiskCache("embeddings")
+
+RELEVANCE_THRESHOLD = 0.29  # threshold for relevance
+LEXICAL_THRESHOLD = 0.3     # normalized BM25 score for an exact term match to count without the embedding
+FUSION_DEPTH = 50           # hits taken from each ranking before they are fused
+LEXICAL_RESULTS = 3         # lexical matches added to the filtered view of the document
+PREFILTER_MIN_SENTENCES = 50_000  # above this only lexical candidates are scored densely
+PREFILTER_CANDIDATES = 2000
+N_SECTIONS = 5              # sections whose sentences are reranked by the section aware search
+SECTION_TEXT_WORDS = 200    # words of section body embedded after the section's context text
+
+
+class DocumentIndex:
+    """Sentences of a parsed document with their normalized embeddings, built once per parse."""
+
+    def __init__(self, sentences: list, embeddings: np.ndarray, lexical: LexicalIndex = None):
+        self.sentences = sentences
+        # rows are unit length so a dot product with a normalized query is the cosine similarity
+        self.embeddings = embeddings
+        # BM25 over the same sentences for clause numbers and acronyms, None ranks on embeddings alone
+        self.lexical = lexical
+
+    def __len__(self):
+        return len(self.sentences)
+
+
+def encode(sentences: list) -> np.ndarray:
+    """Return normalized embeddings for the sentences, only running the model on ones not in the cache."""
+    with telemetry.span("encode", sentences=len(sentences)) as tags:
+        model_id = inference_backend.model_id(MODEL_NAME)
+        keys = [f"{model_id}:{text_hash(s)}" for s in sentences]
+        cached = embedding_cache.get_many(list(set(keys)))
+        # encode each missing sentence once even if it repeats within the document
+        missing = {}
+        for key, sentence in zip(keys, sentences):
+            if key not in cached and key not in missing:
+                missing[key] = sentence
+        tags["encoded"] = len(missing)
+        vectors = {k: np.frombuffer(v, dtype=np.float32) for k, v in cached.items()}
+        if missing:
+            new_embeddings = get_model().encode(list(missing.values()), normalize_embeddings=True,
+                                                convert_to_numpy=True)
+            new_embeddings = new_embeddings.astype(np.float32)
+            vectors.update(zip(missing.keys(), new_embeddings))
+            embedding_cache.put_many({k: vectors[k].tobytes() for k in missing})
+    logger.info(f"Encoded {len(missing)} of {len(sentences)} sentences ({len(sentences) - len(missing)} from cache).")
+    if not sentences:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    return np.stack([vectors[k] for k in keys])
+
+
+def top_k(scores: np.ndarray, k: int):
+    """Return the k highest scores and their column positions for each row, best first."""
+    k = min(k, scores.shape[1])
+    with telemetry.span("top_k", queries=len(scores), sentences=scores.shape[1], k=k):
+        # partition first so we only fully sort k columns per row
+        if k < scores.shape[1]:
+            positions = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            positions = np.tile(np.arange(k), (len(scores), 1))
+        values = np.take_along_axis(scores, positions, axis=1)
+        order = np.argsort(-values, axis=1, kind="stable")
+        return np.take_along_axis(values, order, axis=1), np.take_along_axis(positions, order, axis=1)
+
+
+def flatten_chunks(parsed_doc) -> list:
+    """Flatten the sentences of every chunk of an llmsherpa document into a single list."""
+    if isinstance(parsed_doc, DocumentModel):
+        # already flattened when the model was built
+        return parsed_doc.sentences
+    with telemetry.span("flatten") as tags:
+        sentences = [sentence for chunk in parsed_doc.chunks() for sentence in chunk.sentences]
+        tags["sentences"] = len(sentences)
+    return sentences
+
+
+def build_index(context: list) -> DocumentIndex:
+    """Encode the context sentences once and return a DocumentIndex for repeated queries."""
+    embeddings = encode(context)
+    with telemetry.span("lexical_index", sentences=len(context)):
+        lexical = LexicalIndex.build(context)
+    logger.info(f"Built document index with {len(context)} sentences.")
+    return DocumentIndex(context, embeddings, lexical)
+
+
+def _as_index(context) -> DocumentIndex:
+    """Accept either a prebuilt DocumentIndex or a plain list of sentences."""
+    return context if isinstance(context, DocumentIndex) else build_index(context)
+
+
+class QueryResult:
+    """Ranked hits for one query: scores and sentence positions are numpy arrays in rank order."""
+
+    def __init__(self, query: str, scores: np.ndarray, positions: np.ndarray, sections: list = None):
+        self.query = query
+        self.scores = scores
+        self.positions = positions
+        self.sections = sections  # section title of each hit, if the index knows them
+
+    def __len__(self):
+        return len(self.positions)
+
+    def sentences(self, index: DocumentIndex) -> list:
+        """Return the sentences of the hits from the index they were scored against."""
+        return [index.sentences[i] for i in self.positions]
+
+
+def query_many(queries: list, index, mode: str = "filtered", n_results: int = 1) -> list:
+    """Encode all queries in one batch, score them with a single matrix multiply and rank each one.
+
+    mode "filtered" keeps the relevant half of the document in document order, mode "top" keeps the
+    n_results best sentences ordered by score. Hits at or under RELEVANCE_THRESHOLD are dropped, in
+    filtered mode strong lexical matches for the query are kept anyway.
+    """
+    index = _as_index(index)
+    query_embeddings = encode(queries) if queries and len(index) else None
+    return rank(queries, query_embeddings, index, mode, n_results)
+
+
+def rank(queries: list, query_embeddings: np.ndarray, index: DocumentIndex, mode: str = "filtered",
+         n_results: int = 1) -> list:
+    """Rank already encoded queries against the index, see query_many for the modes.
 
-def query_document(query: str, context: list) -> str:
+    When the index has a lexical index, strong BM25 matches are fused with the embedding ranking (top)
+    or added to the relevant sentences (filtered). Very large indexes only score the lexical candidates.
+    """
+    if mode not in ("filtered", "top"):
+        raise ValueError(f"Unknown query mode: {mode}")
+    if not len(queries) or not len(index):
+        return [QueryResult(q, np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)) for q in queries]
+    if mode == "filtered":
+        k = len(index)//2 if len(index) > 5 else len(index)
+    else:
+        k = min(n_results, len(index))
+    depth = k if mode == "filtered" else max(k, FUSION_DEPTH)
+    prefilter = index.lexical is not None and len(index) > PREFILTER_MIN_SENTENCES
+    lexical_hits = [_lexical_hits(index, q, PREFILTER_CANDIDATES if prefilter else FUSION_DEPTH) for q in queries]
+    if prefilter:
+        dense = [_dense_hits(index, query_embeddings[i], depth, np.sort(lexical_hits[i][1]))
+                 for i in range(len(queries))]
+    else:
+        with telemetry.span("score", queries=len(queries), sentences=len(index)):
+            cosine_scores = query_embeddings @ index.embeddings.T  # (n_queries, n_sentences)
+        dense = list(zip(*top_k(cosine_scores, depth)))
+    results = []
+    for query, query_embedding, (scores, positions), (lexical_scores, lexical_ids) in zip(
+            queries, query_embeddings, dense, lexical_hits):
+        relevant = positions[scores > RELEVANCE_THRESHOLD]
+        exact = lexical_ids[lexical_scores >= LEXICAL_THRESHOLD][:FUSION_DEPTH]
+        if mode == "filtered":
+            # union1d sorts by position to maintain original document order
+            positions = np.union1d(relevant, exact[:LEXICAL_RESULTS]).astype(np.int64)
+            results.append(QueryResult(query, index.embeddings[positions] @ query_embedding, positions))
+        else:
+            results.append(QueryResult(query, *_fuse(index, query_embedding, relevant, exact, k)))
+    return results
+
+
+def _fuse(index: DocumentIndex, query_embedding: np.ndarray, relevant: np.ndarray, exact: np.ndarray,
+          k: int) -> tuple:
+    """Pick k hits by the fused rank of the dense and lexical hits, returns (scores, positions) by score.
+
+    Fusion only decides which sentences make the cut, hits at or under RELEVANCE_THRESHOLD are dropped
+    like in the dense ranking.
+    """
+    fused = reciprocal_rank_fusion([relevant, exact])[0]
+    scores = index.embeddings[fused] @ query_embedding
+    keep = scores > RELEVANCE_THRESHOLD
+    fused, scores = fused[keep][:k], scores[keep][:k]
+    order = np.argsort(-scores, kind="stable")
+    return scores[order], fused[order]
+
+
+def _lexical_hits(index: DocumentIndex, query: str, k: int) -> tuple:
+    if index.lexical is None:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    with telemetry.span("lexical", sentences=len(index), k=k):
+        return index.lexical.search(query, k)
+
+
+def _dense_hits(index: DocumentIndex, query_embedding: np.ndarray, k: int, candidates: np.ndarray) -> tuple:
+    """Score only the candidate sentences, or every sentence if there are none."""
+    if not len(candidates):
+        candidates = np.arange(len(index))
+    with telemetry.span("score", queries=1, sentences=len(candidates)):
+        cosine_scores = index.embeddings[candidates] @ query_embedding
+    scores, positions = top_k(cosine_scores[None, :], k)
+    return scores[0], candidates[positions[0]]
+
+
+def query_document(query: str, context) -> str:
     """Query the document with the given query string and return a response."""
     try:
-        # Encode the query and the context
-        query_embedding = model.encode(query, convert_to_tensor=True)
-        context_embedding = model.encode(context, convert_to_tensor=True)
-        
-        # Compute cosine similarity
-        cosine_scores = model.similarity(query_embedding, context_embedding)
-        # get top results
-        top_results = torch.topk(cosine_scores, k=len(context)//2 if len(context) > 5 else len(context))
-        response = []
-        # generate response based on scores and indices
-        scored_context = zip(top_results.values[0], top_results.indices[0])
-        # sort by index to maintain original order
-        scored_context = sorted(scored_context, key=lambda x: x[1].item())
-        for score, idx in scored_context:
-            if score.item() > 0.29:  # threshold for relevance
-                response.append(f"{context[idx]}")
-                # (Score: {score.item():.4f} | line {idx})")
+        index = _as_index(context)
+        result = query_many([query], index, mode="filtered")[0]
+        response = result.sentences(index)
         return "\n".join(response) if response else "No relevant context found."
     except Exception as e:
         logger.error(f"Error during querying: {e}")
         return f"Error during querying: {e}"
 
 def get_top_result(context, query, n_results=1):
-    query_embedding = model.encode(query, convert_to_tensor=True)
-    context_embedding = model.encode(context, convert_to_tensor=True)
-    cosine_scores = model.similarity(query_embedding, context_embedding)
-    top_results = torch.topk(cosine_scores, k=n_results)
-    # get a list of top results as tuples of (score, index)
-    scored_context = zip(top_results.values[0], top_results.indices[0])
-    scored_context = sorted(scored_context, key=lambda x: x[0].item(), reverse=True)
+    index = _as_index(context)
+    result = query_many([query], index, mode="top", n_results=n_results)[0]
     # join the top results into a response string with score
     response = []
-    for score, idx in scored_context:
-        if score.item() > 0.29:  # threshold for relevance
-            response.append(f"{context[idx]} (Score: {score.item():.4f} | line {idx})")
+    for score, idx in zip(result.scores, result.positions):
+        response.append(f"{index.sentences[idx]} (Score: {score:.4f} | line {idx})")
     return "\n".join(response) if response else "No relevant context found."
-    
+
+
+class SectionIndex(DocumentIndex):
+    """DocumentIndex that also embeds every section, so a query can be narrowed to the best sections first.
+
+    Sentence ids are stored grouped by section: the sentences of section s are order[offsets[s]:offsets[s + 1]].
+    """
+
+    def __init__(self, sentences: list, embeddings: np.ndarray, lexical: LexicalIndex, titles: list,
+                 section_embeddings: np.ndarray, sentence_sections: np.ndarray):
+        super().__init__(sentences, embeddings, lexical)
+        self.titles = titles
+        self.section_embeddings = section_embeddings
+        self.sentence_sections = sentence_sections
+        self.order = np.argsort(sentence_sections, kind="stable")
+        self.offsets = np.searchsorted(sentence_sections[self.order], np.arange(len(titles) + 1))
+
+    def members(self, section_ids) -> np.ndarray:
+        """Return the sentence ids of the given sections in document order."""
+        parts = [self.order[self.offsets[s]:self.offsets[s + 1]] for s in section_ids]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def section_title(self, position: int) -> str:
+        return self.titles[self.sentence_sections[position]]
+
+
+def build_section_index(source) -> SectionIndex:
+    """Encode the sentences and the sections of a DocumentModel or llmsherpa document for section aware search.
+
+    Each section is embedded as section.to_context_text(include_section_info=True), the parent
+    headers and title, followed by the start of the sentences that belong to it.
+    """
+    model = source if isinstance(source, DocumentModel) else DocumentModel(source)
+    titles = list(model.titles)
+    contexts = [model.section_context(i) for i in range(len(titles))]
+    if (model.sentence_sections == model.no_section).any():
+        # sentences above the first header
+        titles.append("")
+        contexts.append("")
+    section_texts = [
+        f"{context}\n{' '.join(' '.join(model.section_sentences(i)).split()[:SECTION_TEXT_WORDS])}".strip()
+        for i, context in enumerate(contexts)
+    ]
+    index = build_index(model.sentences)
+    section_embeddings = encode(section_texts)
+    logger.info(f"Built section index with {len(titles)} sections.")
+    return SectionIndex(model.sentences, index.embeddings, index.lexical, titles, section_embeddings,
+                        model.sentence_sections)
+
+
+def query_sections(queries: list, index, n_results: int = 1, n_sections: int = N_SECTIONS) -> list:
+    """Score the queries against the section embeddings, then rerank only the sentences of the top sections.
+
+    Strong lexical matches anywhere in the document are fused in like query_many's top mode. Indexes
+    without sections fall back to query_many.
+    """
+    if not isinstance(index, SectionIndex):
+        return query_many(queries, index, mode="top", n_results=n_results)
+    if not queries or not len(index):
+        return [QueryResult(q, np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64), []) for q in queries]
+    k = min(n_results, len(index))
+    query_embeddings = encode(queries)
+    with telemetry.span("section_score", queries=len(queries), sections=len(index.titles)):
+        section_scores = query_embeddings @ index.section_embeddings.T
+    _, top_sections = top_k(section_scores, n_sections)
+    results = []
+    for query, query_embedding, section_ids in zip(queries, query_embeddings, top_sections):
+        candidates = index.members(section_ids)
+        scores, positions = _dense_hits(index, query_embedding, max(k, FUSION_DEPTH), candidates)
+        lexical_scores, lexical_ids = _lexical_hits(index, query, FUSION_DEPTH)
+        relevant = positions[scores > RELEVANCE_THRESHOLD]
+        exact = lexical_ids[lexical_scores >= LEXICAL_THRESHOLD]
+        scores, positions = _fuse(index, query_embedding, relevant, exact, k)
+        results.append(QueryResult(query, scores, positions, [index.section_title(p) for p in positions]))
+    return results
+
+
+def get_top_section_results(index, query, n_results=1):
+    """Like get_top_result, with each hit prefixed by the title of its section."""
+    result = query_sections([query], index, n_results=n_results)[0]
+    sections = result.sections or [""] * len(result)
+    response = []
+    for score, idx, section in zip(result.scores, result.positions, sections):
+        prefix = f"[{section}] " if section else ""
+        response.append(f"{prefix}{index.sentences[idx]} (Score: {score:.4f} | line {idx})")
+    return "\n".join(response) if response else "No relevant context found."
+
+
 if __name__ == "__main__":
+    telemetry.configure_logging()
     # Example query and context
     query = "What is the purpose of the Contractor?"
     context = [
@@ -66,7 +335,13 @@ if __name__ == "__main__":
         'Deliverables in this contract include the design, development, testing, implementation and documentation tasks.'
     ]
     
-    response = query_document(query, context)
+    index = build_index(context)
+    response = query_document(query, index)
     print("Query Response:")
     print(response)
-        
\ No newline at end of file
+
+    # run a checklist of questions in a single batch
+    checklist = ["Does the contract involve the Privacy Act?", "What are the deliverables?"]
+    for result in query_many(checklist, index, mode="top", n_results=2):
+        print(f"{result.query}: positions {result.positions.tolist()} scores {result.scores.round(4).tolist()}")
+        
@@ -0,0 +1,399 @@
+# query_server.py
+# headless local HTTP server over query_doc and sum_text, concurrent requests share encode and summarizer batches
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+import numpy as np
+import query_doc
+import sum_text
+from disk_cache import cache_stats
+from model_manager import manager
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+PARSER_API_URL = "http://localhost:5010/api/parseDocument?renderFormat=all"
+HOST = "127.0.0.1"
+PORT = 8765
+BATCH_WINDOW_MS = 5      # how long a batch waits for more requests after the first one arrives
+MAX_QUERY_BATCH = 64     # query strings per encode call
+MAX_SUMMARY_BATCH = sum_text.BATCH_SIZE
+MAX_CONCURRENCY = 32     # requests handled at once, the rest wait for a slot
+MAX_QUEUE = 512          # items waiting for a batch before requests are turned away with 503
+MAX_DOCUMENTS = 32       # document indexes kept in memory
+MAX_BODY_BYTES = 32 * 2**20
+
+
+class QueueFull(Exception):
+    """Raised when a batcher already has max_queue items waiting."""
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class MicroBatcher:
+    """Collects items submitted by concurrent requests and runs them through process in one call.
+
+    A batch is closed window_ms after its first item arrives or when it holds max_batch items.
+    process(items) runs on a single worker thread so model calls never overlap, and must return
+    one result per item.
+    """
+
+    def __init__(self, name: str, process, window_ms: float = BATCH_WINDOW_MS, max_batch: int = 32,
+                 max_queue: int = MAX_QUEUE):
+        self.name = name
+        self.process = process
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"batch-{name}")
+        self.pending = []  # (item, future)
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self._wakeup = None
+        self._full = None
+        self._task = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.pending)
+
+    async def submit(self, items: list) -> list:
+        """Queue items for the next batches and return their results once they have run."""
+        if len(self.pending) + len(items) > self.max_queue:
+            raise QueueFull(f"{self.name} queue is full ({len(self.pending)} items waiting)")
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in items]
+        self.pending.extend(zip(items, futures))
+        self._wakeup.set()
+        if len(self.pending) >= self.max_batch:
+            self._full.set()
+        return list(await asyncio.gather(*futures))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            # give requests arriving in the next few milliseconds a chance to join the batch
+            if len(self.pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+            batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+            if len(self.pending) < self.max_batch:
+                self._full.clear()
+            if not self.pending:
+                self._wakeup.clear()
+            batch = [(item, future) for item, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            try:
+                results = await loop.run_in_executor(self.executor, self.process, [item for item, _ in batch])
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "max_batch": self.max_batch,
+            "window_ms": self.window * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": self.items / self.batches if self.batches else None,
+            "largest_batch": self.largest_batch,
+        }
+
+
+def encode_batch(queries: list) -> list:
+    """One encode call for every query string in the batch."""
+    return list(query_doc.encode(queries))
+
+
+def summarize_batch(items: list) -> list:
+    """Summarize (chunk, n_tokens, backend name) items with one summarize_chunks call per backend."""
+    summaries = [None] * len(items)
+    by_backend = {}
+    for i, (_, _, backend) in enumerate(items):
+        by_backend.setdefault(backend, []).append(i)
+    for backend, positions in by_backend.items():
+        outputs = sum_text.summarize_chunks([items[i][0] for i in positions], [items[i][1] for i in positions],
+                                            batch_size=MAX_SUMMARY_BATCH, backend=backend)
+        for i, summary in zip(positions, outputs):
+            summaries[i] = summary
+    return summaries
+
+
+class QueryServer:
+    """Routes JSON requests to the document indexes and the query and summary batchers."""
+
+    def __init__(self, window_ms: float = BATCH_WINDOW_MS, max_concurrency: int = MAX_CONCURRENCY,
+                 max_queue: int = MAX_QUEUE, max_documents: int = MAX_DOCUMENTS):
+        self.max_concurrency = max_concurrency
+        self.max_documents = max_documents
+        self.query_batcher = MicroBatcher("encode", encode_batch, window_ms, MAX_QUERY_BATCH, max_queue)
+        self.summary_batcher = MicroBatcher("summarize", summarize_batch, window_ms, MAX_SUMMARY_BATCH, max_queue)
+        # indexing and ranking are CPU bound, they run off the event loop so it keeps serving connections and
+        # never holds up a query batch. Ranking has its own thread so queries do not wait behind an index build.
+        self.index_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index")
+        self.rank_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rank")
+        # the fast tokenizer is not safe to call from several threads at once
+        self.tokenize_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tokenize")
+        self.indexes = OrderedDict()
+        self.reader = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.rejected = 0
+        self.started = time.time()
+        self._slots = None
+
+    async def start(self, preload: bool = True):
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.query_batcher.start()
+        self.summary_batcher.start()
+        if preload:
+            # load the models once up front so the first requests do not pay for it
+            manager.preload("embedding")
+            manager.preload("summarizer")
+            manager.preload("summarizer_tokenizer")
+
+    async def stop(self):
+        await self.query_batcher.stop()
+        await self.summary_batcher.stop()
+        self.index_executor.shutdown(wait=False, cancel_futures=True)
+        self.rank_executor.shutdown(wait=False, cancel_futures=True)
+        self.tokenize_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _index(self, document_id: str) -> query_doc.DocumentIndex:
+        if document_id not in self.indexes:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown document: {document_id}")
+        self.indexes.move_to_end(document_id)
+        return self.indexes[document_id]
+
+    def _build_index(self, document_id: str, body: dict) -> query_doc.DocumentIndex:
+        with telemetry.document_context(document_id):
+            if "sentences" in body:
+                sentences = body["sentences"]
+            else:
+                if self.reader is None:
+                    from parse_cache import CachedPDFReader
+                    self.reader = CachedPDFReader(PARSER_API_URL)
+                sentences = query_doc.flatten_chunks(self.reader.read_pdf(body["path"]))
+            return query_doc.build_index(sentences)
+
+    async def handle_index(self, body: dict) -> dict:
+        """Build and keep the index of a document given as "sentences" or a PDF "path"."""
+        document_id = body.get("document_id") or body.get("path")
+        if not document_id or not ("sentences" in body or "path" in body):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "index needs document_id with sentences, or a path")
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(self.index_executor, self._build_index, document_id, body)
+        self.indexes[document_id] = index
+        self.indexes.move_to_end(document_id)
+        while len(self.indexes) > self.max_documents:
+            self.indexes.popitem(last=False)
+        return {"document_id": document_id, "sentences": len(index)}
+
+    @staticmethod
+    def _positive_int(body: dict, name: str, default: int) -> int:
+        value = body.get(name, default)
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be a positive integer")
+        try:
+            number = int(value)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be a positive integer") from None
+        if number < 1 or number != float(value):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be a positive integer")
+        return number
+
+    async def handle_query(self, body: dict) -> dict:
+        """Rank one query, or a list of queries, against an indexed document."""
+        index = self._index(body.get("document_id"))
+        queries = body.get("queries") or [body.get("query")]
+        if not isinstance(queries, list):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "queries must be a list of strings")
+        if not all(isinstance(q, str) and q for q in queries):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "query must be a non empty string")
+        mode = body.get("mode", "filtered")
+        if mode not in ("filtered", "top"):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unknown query mode: {mode}")
+        n_results = self._positive_int(body, "n_results", 1)
+        embeddings = await self.query_batcher.submit(queries)
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(self.rank_executor, query_doc.rank, queries, np.stack(embeddings),
+                                             index, mode, n_results)
+        return {"results": [
+            {"query": r.query,
+             "hits": [{"position": int(p), "score": float(s), "sentence": index.sentences[p]}
+                      for s, p in zip(r.scores, r.positions)]}
+            for r in results
+        ]}
+
+    async def handle_summarize(self, body: dict) -> dict:
+        """Summarize text, its chunks share summarizer batches with other requests."""
+        text = (body.get("text") or "").strip()
+        if not text:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "summarize needs text")
+        loop = asyncio.get_running_loop()
+        chunks, lengths = await loop.run_in_executor(
+            self.tokenize_executor, lambda: sum_text.pack_chunks(text, return_lengths=True)
+        )
+        if body.get("backend"):
+            if body["backend"] not in sum_text.BACKENDS:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unknown backend: {body['backend']}")
+            backend = sum_text.get_backend(body["backend"])
+        else:
+            backend = sum_text.select_backend(sum(lengths), body.get("latency_budget"))
+        summaries = await self.summary_batcher.submit([(c, n, backend.name) for c, n in zip(chunks, lengths)])
+        return {"summary": "\n".join(summaries), "chunks": len(chunks), "backend": backend.name}
+
+    def stats(self) -> dict:
+        return {
+            "uptime_seconds": time.time() - self.started,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "in_flight": self.in_flight,
+            "waiting_for_slot": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "documents": len(self.indexes),
+            "batchers": {b.name: b.stats() for b in (self.query_batcher, self.summary_batcher)},
+            "stages": telemetry.metrics.summary(),
+            "caches": cache_stats(),
+            "models": manager.statuses(),
+            "model_memory_mb": manager.loaded_size_mb(),
+        }
+
+    async def dispatch(self, method: str, path: str, body: dict) -> dict:
+        if (method, path) == ("GET", "/health"):
+            return {"status": "ok"}
+        if (method, path) == ("GET", "/stats"):
+            return self.stats()
+        routes = {"/index": self.handle_index, "/query": self.handle_query, "/summarize": self.handle_summarize}
+        if method != "POST" or path not in routes:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+        if not isinstance(body, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "request body must be a JSON object")
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            return await routes[path](body)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                status, payload = await self._respond(method, path.split("?")[0], length, reader)
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}"
+                    f"\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError) as e:
+            logger.debug(f"Connection closed: {e}")
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, path: str, length: int, reader: asyncio.StreamReader):
+        self.requests += 1
+        try:
+            if length > MAX_BODY_BYTES:
+                raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+            body = json.loads(await reader.readexactly(length)) if length else {}
+            return HTTPStatus.OK, await self.dispatch(method, path, body)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except QueueFull as e:
+            self.rejected += 1
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)}
+        except json.JSONDecodeError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": f"Invalid JSON: {e}"}
+        except Exception as e:
+            logger.error(f"Error handling {method} {path}: {e}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+
+async def serve(host: str = HOST, port: int = PORT, preload: bool = True, **server_options):
+    app = QueryServer(**server_options)
+    await app.start(preload)
+    server = await asyncio.start_server(app.handle_connection, host, port)
+    logger.info(f"Query server listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await app.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve document queries and summaries over local HTTP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW_MS, help="micro-batch collection window")
+    parser.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENCY, help="requests handled at once")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE, help="items waiting per batcher before 503")
+    parser.add_argument("--max-documents", type=int, default=MAX_DOCUMENTS, help="document indexes kept in memory")
+    parser.add_argument("--no-preload", action="store_true", help="load models on first use instead of at startup")
+    args = parser.parse_args()
+    telemetry.configure_logging("query_server.log")
+    try:
+        asyncio.run(serve(args.host, args.port, not args.no_preload, window_ms=args.window_ms,
+                          max_concurrency=args.max_concurrency, max_queue=args.max_queue,
+                          max_documents=args.max_documents))
+    except KeyboardInterrupt:
+        pass
@@ -1,17 +1,469 @@
+import json
 import logging
-import sys
-from transformers import pipeline
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("sum_text.log",encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+import multiprocessing
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from collections import OrderedDict
+from disk_cache import CACHE_DIR, DiskCache, text_hash
+from model_manager import manager
+import inference_backend
+import query_doc
+import telemetry
 logger = logging.getLogger(__name__)
-# Load a summarization pipeline
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+SUMMARIZER_MODEL = "facebook/bart-large-cnn"
+DISTILLED_MODEL = "sshleifer/distilbart-cnn-12-6"
+DEFAULT_BACKEND = "bart"
+LATENCY_FILE = os.path.join(CACHE_DIR, "summarizer_latency.json")
+MAX_CHUNK_TOKENS = 900   # stay under BART's 1024 token window with room for special tokens
+BATCH_SIZE = 8           # chunks per summarizer call
+SENTENCE_REGEX = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9(\"\'])')
+GENERATION_KWARGS = {"truncation": True}  # passed to every summarizer call and part of the cache key
+MEMORY_CACHE_SIZE = 1024
+CANCEL_POLL_SECONDS = 0.2  # how often summarize_document checks its cancellation token while waiting
+
+
+class SummaryCache:
+    """In-memory LRU in front of an on-disk cache of chunk summaries."""
+
+    def __init__(self, max_memory: int = MEMORY_CACHE_SIZE):
+        self.max_memory = max_memory
+        self.memory = OrderedDict()
+        self.disk = DiskCache("summaries")
+        self.memory_hits = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(chunk: str, model_id: str, generation_kwargs: dict) -> str:
+        settings = json.dumps(generation_kwargs, sort_keys=True)
+        return f"{model_id}:{text_hash(settings)}:{text_hash(chunk)}"
+
+    def _remember(self, key, summary):
+        self.memory[key] = summary
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys: list) -> dict:
+        """Return the cached summaries for keys, checking memory before disk."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+            self.memory_hits += len(found)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            for key, value in self.disk.get_many(missing).items():
+                found[key] = value.decode("utf-8")
+                with self._lock:
+                    self._remember(key, found[key])
+        return found
+
+    def put_many(self, items: dict):
+        with self._lock:
+            for key, summary in items.items():
+                self._remember(key, summary)
+        self.disk.put_many({key: summary.encode("utf-8") for key, summary in items.items()})
+
+
+summary_cache = SummaryCache()
+
+
+def _load_summarizer():
+    # loaded through the backend module so importing sum_text does not pull in transformers and torch
+    return inference_backend.load_summarization_pipeline(SUMMARIZER_MODEL)
+
+
+def _load_distilled_summarizer():
+    return inference_backend.load_summarization_pipeline(DISTILLED_MODEL)
+
+
+def _load_tokenizer():
+    return inference_backend.load_tokenizer(SUMMARIZER_MODEL)
+
+
+manager.register("summarizer", _load_summarizer)
+manager.register("summarizer_distilled", _load_distilled_summarizer)
+manager.register("summarizer_tokenizer", _load_tokenizer)
+
+
+def get_summarizer():
+    """Return the summarization pipeline, loading it on first use."""
+    return manager.get("summarizer")
+
+
+def get_tokenizer():
+    """Return the summarizer's fast tokenizer, which is much lighter to load than the model."""
+    return manager.get("summarizer_tokenizer")
+
+
+def _load_latencies() -> dict:
+    try:
+        with open(LATENCY_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class SummarizerBackend(ABC):
+    """A summarizer with a quality rank and its measured latency per 1k input tokens."""
+
+    def __init__(self, name: str, quality: int, ms_per_1k_tokens: float):
+        self.name = name
+        self.quality = quality  # higher is better, used to pick among backends that fit a budget
+        # start from a rough prior and replace it with measurements as chunks are summarized
+        self.ms_per_1k_tokens = _load_latencies().get(name, ms_per_1k_tokens)
+
+    @property
+    @abstractmethod
+    def model_id(self) -> str:
+        """Identifier of the model and settings, part of the summary cache key."""
+
+    @abstractmethod
+    def load(self):
+        """Load the model the backend runs on, so load time is not measured as summarization time."""
+
+    @abstractmethod
+    def run(self, chunks: list, batch_size: int, **generation_kwargs) -> list:
+        """Return one summary per chunk."""
+
+    def estimate_seconds(self, n_tokens: int) -> float:
+        return self.ms_per_1k_tokens * n_tokens / 1000 / 1000
+
+    def record(self, n_tokens: int, seconds: float):
+        """Fold a measured run into the latency estimate and persist it for the next session."""
+        if n_tokens <= 0:
+            return
+        measured = seconds * 1000 / (n_tokens / 1000)
+        self.ms_per_1k_tokens = 0.7 * self.ms_per_1k_tokens + 0.3 * measured
+        latencies = _load_latencies()
+        latencies[self.name] = self.ms_per_1k_tokens
+        try:
+            os.makedirs(os.path.dirname(LATENCY_FILE), exist_ok=True)
+            tmp_path = f"{LATENCY_FILE}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(latencies, f)
+            os.replace(tmp_path, LATENCY_FILE)
+        except OSError as e:
+            logger.warning(f"Could not save summarizer latencies: {e}")
+
+
+class Seq2SeqBackend(SummarizerBackend):
+    """Abstractive summarization with a transformers pipeline held by the model manager."""
+
+    def __init__(self, name: str, model_name: str, manager_name: str, quality: int, ms_per_1k_tokens: float):
+        super().__init__(name, quality, ms_per_1k_tokens)
+        self.model_name = model_name
+        self.manager_name = manager_name
+
+    @property
+    def model_id(self) -> str:
+        return inference_backend.model_id(self.model_name)
+
+    def load(self):
+        return manager.get(self.manager_name)
+
+    def run(self, chunks: list, batch_size: int, **generation_kwargs) -> list:
+        outputs = manager.get(self.manager_name)(chunks, batch_size=batch_size, **generation_kwargs)
+        return [output['summary_text'] if output else "No summary available." for output in outputs]
+
+
+class ExtractiveBackend(SummarizerBackend):
+    """Picks the sentences closest to the chunk centroid using the MiniLM embeddings from query_doc."""
+
+    def __init__(self, name: str, quality: int, ms_per_1k_tokens: float, ratio: float = 0.2, max_sentences: int = 3):
+        super().__init__(name, quality, ms_per_1k_tokens)
+        self.ratio = ratio
+        self.max_sentences = max_sentences
+
+    @property
+    def model_id(self) -> str:
+        return f"extractive:{inference_backend.model_id(query_doc.MODEL_NAME)}:{self.ratio}:{self.max_sentences}"
+
+    def load(self):
+        return query_doc.get_model()
+
+    def run(self, chunks: list, batch_size: int, **generation_kwargs) -> list:
+        summaries = []
+        for chunk in chunks:
+            sentences = split_sentences(chunk)
+            if len(sentences) <= 1:
+                summaries.append(chunk.strip() or "No summary available.")
+                continue
+            embeddings = query_doc.encode(sentences)
+            centroid = embeddings.mean(axis=0)
+            scores = embeddings @ centroid
+            n_keep = max(1, min(self.max_sentences, round(len(sentences) * self.ratio)))
+            # keep the chosen sentences in their original order
+            keep = sorted(scores.argsort()[::-1][:n_keep])
+            summaries.append(" ".join(sentences[i] for i in keep))
+        return summaries
+
+
+BACKENDS = {}
+
+
+def register_backend(backend: SummarizerBackend):
+    """Make a backend available to get_backend and select_backend."""
+    BACKENDS[backend.name] = backend
+
+
+register_backend(Seq2SeqBackend("bart", SUMMARIZER_MODEL, "summarizer", quality=3, ms_per_1k_tokens=6000))
+register_backend(Seq2SeqBackend("distilbart", DISTILLED_MODEL, "summarizer_distilled", quality=2,
+                                ms_per_1k_tokens=3000))
+register_backend(ExtractiveBackend("extractive", quality=1, ms_per_1k_tokens=50))
+
+
+def get_backend(backend=None) -> SummarizerBackend:
+    """Return a backend by name, passing backend objects through, defaulting to DEFAULT_BACKEND."""
+    if isinstance(backend, SummarizerBackend):
+        return backend
+    return BACKENDS[backend or DEFAULT_BACKEND]
+
+
+def select_backend(n_tokens: int, latency_budget: float = None) -> SummarizerBackend:
+    """Return the best quality backend expected to summarize n_tokens within latency_budget seconds.
+
+    Without a budget the default backend is used. If no backend fits, the fastest one is used.
+    """
+    if latency_budget is None:
+        return get_backend()
+    fitting = [b for b in BACKENDS.values() if b.estimate_seconds(n_tokens) <= latency_budget]
+    if fitting:
+        backend = max(fitting, key=lambda b: b.quality)
+    else:
+        backend = min(BACKENDS.values(), key=lambda b: b.ms_per_1k_tokens)
+    logger.info(f"Selected {backend.name} backend for {n_tokens} tokens "
+                f"(~{backend.estimate_seconds(n_tokens):.2f}s, budget {latency_budget}s)")
+    return backend
+
+
+def _summary_key(chunk: str, backend: SummarizerBackend, generation_kwargs: dict) -> str:
+    return SummaryCache.key(chunk, backend.model_id, generation_kwargs)
+
+
+def _run_backend(backend: SummarizerBackend, chunks: list, n_tokens: int, generation_kwargs: dict) -> list:
+    """Run the backend on a batch and record how long it took."""
+    # a cold start would otherwise be recorded as the backend's speed and steer select_backend for good
+    backend.load()
+    start = time.perf_counter()
+    with telemetry.span("summarize", backend=backend.name, chunks=len(chunks), tokens=n_tokens):
+        summaries = backend.run(chunks, len(chunks), **generation_kwargs)
+    backend.record(n_tokens, time.perf_counter() - start)
+    return summaries
+
+
+def split_sentences(text: str) -> list:
+    """Split text into sentences on line breaks and sentence ending punctuation."""
+    sentences = []
+    for line in text.split("\n"):
+        sentences.extend(s.strip() for s in SENTENCE_REGEX.split(line) if s.strip())
+    return sentences
+
+
+def pack_chunks(text: str, max_tokens: int = MAX_CHUNK_TOKENS, tokenizer=None, return_lengths: bool = False):
+    """Greedily pack whole sentences into chunks of at most max_tokens tokens.
+
+    Sentences longer than the budget are split on token boundaries. With return_lengths the token
+    count of each chunk is returned as well.
+    """
+    tokenizer = tokenizer or get_tokenizer()
+    sentences = split_sentences(text)
+    if not sentences:
+        return ([], []) if return_lengths else []
+    # one batched call to the fast tokenizer for every sentence
+    token_ids = tokenizer(sentences, add_special_tokens=False)["input_ids"]
+    chunks, lengths = [], []
+    current, current_len = [], 0
+    for sentence, ids in zip(sentences, token_ids):
+        if len(ids) > max_tokens:
+            pieces = [ids[i:i + max_tokens] for i in range(0, len(ids), max_tokens)]
+            pieces = [(tokenizer.decode(piece), len(piece)) for piece in pieces]
+        else:
+            pieces = [(sentence, len(ids))]
+        for piece, n_tokens in pieces:
+            if current and current_len + n_tokens > max_tokens:
+                chunks.append(" ".join(current))
+                lengths.append(current_len)
+                current, current_len = [], 0
+            current.append(piece)
+            current_len += n_tokens
+    if current:
+        chunks.append(" ".join(current))
+        lengths.append(current_len)
+    logger.info(f"Packed {len(sentences)} sentences into {len(chunks)} chunks of up to {max_tokens} tokens.")
+    return (chunks, lengths) if return_lengths else chunks
+
+
+def summarize_chunks(chunks: list, lengths: list = None, batch_size: int = BATCH_SIZE,
+                     use_cache: bool = True, backend=None, **generation_kwargs) -> list:
+    """Summarize chunks in batches of similar length and return the summaries in the original order.
+
+    Chunks summarized before with the same backend and generation settings come from the cache.
+    """
+    backend = get_backend(backend)
+    generation_kwargs = {**GENERATION_KWARGS, **generation_kwargs}
+    lengths = lengths or [len(chunk.split()) for chunk in chunks]
+    keys = [_summary_key(chunk, backend, generation_kwargs) for chunk in chunks]
+    cached = summary_cache.get_many(keys) if use_cache else {}
+    summaries = [cached.get(key) for key in keys]
+    # each distinct uncached chunk is summarized once, sorting by length keeps padding inside each batch small
+    todo = {}
+    for i, key in enumerate(keys):
+        if summaries[i] is None and key not in todo:
+            todo[key] = i
+    order = sorted(todo.values(), key=lambda i: lengths[i])
+    logger.info(f"{len(chunks) - len(order)} of {len(chunks)} chunk summaries from cache.")
+    new_summaries = {}
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        outputs = _run_backend(backend, [chunks[i] for i in batch], sum(lengths[i] for i in batch),
+                               generation_kwargs)
+        for i, summary in zip(batch, outputs):
+            new_summaries[keys[i]] = summary
+        logger.info(f"Summarized {min(start + batch_size, len(order))} of {len(order)} chunks with {backend.name}.")
+    if use_cache:
+        summary_cache.put_many(new_summaries)
+    return [summary if summary is not None else new_summaries[key] for summary, key in zip(summaries, keys)]
+
+def iter_summarize_chunks(chunks: list, lengths: list = None, batch_size: int = BATCH_SIZE, use_cache: bool = True,
+                          backend=None, **generation_kwargs):
+    """Yield (index, summary) for each chunk in document order as soon as its summary is ready.
+
+    The first uncached chunk is summarized on its own so the first output arrives after one chunk,
+    later chunks go through the model in batches.
+    """
+    backend = get_backend(backend)
+    generation_kwargs = {**GENERATION_KWARGS, **generation_kwargs}
+    lengths = lengths or [len(chunk.split()) for chunk in chunks]
+    keys = [_summary_key(chunk, backend, generation_kwargs) for chunk in chunks]
+    known = summary_cache.get_many(keys) if use_cache else {}
+    next_batch_size = 1
+    i = 0
+    while i < len(chunks):
+        if keys[i] in known:
+            yield i, known[keys[i]]
+            i += 1
+            continue
+        # summarize the next run of uncached chunks, in document order
+        batch = []
+        j = i
+        while j < len(chunks) and len(batch) < next_batch_size:
+            if keys[j] not in known and keys[j] not in {keys[b] for b in batch}:
+                batch.append(j)
+            j += 1
+        outputs = _run_backend(backend, [chunks[b] for b in batch], sum(lengths[b] for b in batch),
+                               generation_kwargs)
+        new_summaries = {keys[b]: summary for b, summary in zip(batch, outputs)}
+        if use_cache:
+            summary_cache.put_many(new_summaries)
+        known.update(new_summaries)
+        next_batch_size = batch_size
+
+
+def iter_summaries(text: str, batch_size: int = BATCH_SIZE, latency_budget: float = None, backend=None):
+    """Yield (chunk index, chunk count, summary) for the text as each chunk summary is ready.
+
+    Pass a backend name to force a backend, or a latency_budget in seconds to pick one automatically.
+    """
+    chunks, lengths = pack_chunks(text.strip(), return_lengths=True)
+    backend = get_backend(backend) if backend else select_backend(sum(lengths), latency_budget)
+    for i, summary in iter_summarize_chunks(chunks, lengths, batch_size, backend=backend):
+        logger.info(f"Summarized chunk {i + 1} of {len(chunks)}.")
+        yield i, len(chunks), summary
+
+def document_texts(source) -> list:
+    """Return the text blocks of a DocumentModel or parsed llmsherpa Document, or chunkPDF.process_pdf paragraphs."""
+    if hasattr(source, "chunk_texts"):
+        return list(source.chunk_texts)
+    if hasattr(source, "chunks"):
+        return [chunk.to_context_text(include_section_info=False) for chunk in source.chunks()]
+    if isinstance(source, str):
+        return [source]
+    return list(source)
+
+
+def _init_map_worker(torch_threads: int):
+    """Split the CPU cores between the worker processes, each loads its own model on first use."""
+    global summary_cache
+    # each worker opens its own cache connection, SQLite connections must not cross processes
+    summary_cache = SummaryCache()
+    import torch
+    torch.set_num_threads(torch_threads)
+
+
+def _summarize_group(chunks: list, backend_name: str = None) -> list:
+    """Map step run inside a worker process."""
+    return summarize_chunks(chunks, backend=backend_name)
+
+
+def _collect(futures: list, token=None) -> list:
+    """Return the results of futures in order, checking token while they run."""
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_EXCEPTION)
+        if token is not None:
+            token.check()
+        for future in done:
+            if future.exception() is not None:
+                raise future.exception()
+    return [future.result() for future in futures]
+
+
+def summarize_document(source, target_words: int = 500, workers: int = None, max_levels: int = 5,
+                       backend: str = None, token=None):
+    """Summarize a whole document into roughly target_words words with map-reduce over a process pool.
+
+    Level 0 summarizes every packed chunk of the document in parallel. Each further level packs the
+    previous summaries into chunks and summarizes those, until the result fits target_words or stops
+    shrinking. Returns (summary, timings) where timings has one entry per level.
+
+    token is a job_scheduler cancellation token, checked between levels and while a level runs.
+    """
+    text = "\n".join(t for t in document_texts(source) if t.strip())
+    workers = workers or max(1, min(4, (os.cpu_count() or 2) // 2))
+    timings = []
+    # spawn, forked workers would inherit the caller's threads, held locks and open SQLite connections
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_map_worker,
+                               initargs=(max(1, (os.cpu_count() or 1) // workers),))
+    finished = False
+    try:
+        for level in range(max_levels):
+            if token is not None:
+                token.check()
+            input_words = len(text.split())
+            if level > 0 and input_words <= target_words:
+                break
+            start = time.perf_counter()
+            chunks = pack_chunks(text)
+            # one group of up to BATCH_SIZE chunks per task so each worker batches its own model calls
+            groups = [chunks[i:i + BATCH_SIZE] for i in range(0, len(chunks), BATCH_SIZE)]
+            results = _collect([pool.submit(_summarize_group, group, backend) for group in groups], token)
+            summaries = [summary for group in results for summary in group]
+            text = "\n".join(summaries)
+            timings.append({
+                "level": level,
+                "chunks": len(chunks),
+                "input_words": input_words,
+                "output_words": len(text.split()),
+                "seconds": time.perf_counter() - start,
+            })
+            logger.info(f"Summary level {level}: {len(chunks)} chunks, {input_words} -> "
+                        f"{timings[-1]['output_words']} words in {timings[-1]['seconds']:.1f}s")
+            if timings[-1]["output_words"] >= input_words:
+                # a level that did not shrink the text will not converge on the target
+                break
+        finished = True
+    finally:
+        # on cancellation or error drop the queued groups and return without waiting for the running ones
+        pool.shutdown(wait=finished, cancel_futures=True)
+    return text, timings
 
 def split_text_into_chunks(text: str, sentences_per_chunk: int = 3) -> list:
     """Split the input text into chunks that fit within the threshold of sentences_per_chunk."""
@@ -33,19 +485,17 @@ def split_text_into_chunks(text: str, sentences_per_chunk: int = 3) -> list:
         logger.info(f"Created final chunk: {len(chunks)} of size {len(chunks[-1].split())} words.")
     return chunks
 
-def summarize_text(text: str) -> str:
-    """Summarize the input text using the summarization pipeline."""
+def summarize_text(text: str, latency_budget: float = None, backend: str = None) -> str:
+    """Summarize the input text using the summarization pipeline.
+
+    Pass a backend name to force a backend, or a latency_budget in seconds to pick one automatically.
+    """
     try:
-        # Split text into chunks if it exceeds the word limit
-        chunks = split_text_into_chunks(text.strip(), sentences_per_chunk=7)  # Use 142 as a safe limit for BART attention
-        summaries = []
-        
-        for chunk in chunks:
-            summary = summarizer(chunk)
-            summaries.append(summary[0]['summary_text'] if summary else "No summary available.")
-            logger.info(f"Processed chunk: {chunk[:50]}...")
-            
-        
+        # Pack sentences into chunks that fill BART's attention window without overflowing it
+        chunks, lengths = pack_chunks(text.strip(), return_lengths=True)
+        selected = get_backend(backend) if backend else select_backend(sum(lengths), latency_budget)
+        summaries = summarize_chunks(chunks, lengths, backend=selected)
+
         # Combine all summaries into a single summary
         return "\n".join(summaries)
     except Exception as e:
@@ -53,6 +503,7 @@ def summarize_text(text: str) -> str:
         return f"Error during summarization: {e}"
 
 if __name__ == "__main__":
+    telemetry.configure_logging("sum_text.log")
     # Example input text
     input_text = '''The Contractor will be required to design, develop, or operate a system of records on individuals, to accomplish 
                     an agency function subject to the Privacy Act of 1974, Public Law 93-579, December 31, 1974 (5 U.S.C. 552a) and 
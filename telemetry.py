@@ -0,0 +1,152 @@
+# telemetry.py
+# stage timing spans, in-process latency metrics and structured JSON logging for the app modules
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+RECENT_SPANS = 200  # latencies kept per stage for the percentiles
+_document = contextvars.ContextVar("document", default=None)
+_listener = None
+_listener_lock = threading.Lock()
+# attributes every LogRecord has, anything else was passed through extra= and goes into the JSON
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including any fields passed with extra=."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(log_file: str = "RAGapp.log", level: int = logging.INFO):
+    """Send log records through a queue so file and console writes happen off the calling thread.
+
+    Records are written to log_file as JSON lines and to stdout as plain text. Calling it again is a no-op.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler,
+                                                   respect_handler_level=True)
+        _listener.start()
+        # flush whatever is still queued when the interpreter exits
+        atexit.register(_listener.stop)
+
+
+class Metrics:
+    """Recent span durations per stage, kept in memory for the diagnostics panel."""
+
+    def __init__(self, max_recent: int = RECENT_SPANS):
+        self._lock = threading.Lock()
+        self._recent = {}
+        self._counts = {}
+        self._errors = {}
+        self._last = deque(maxlen=max_recent)
+        self.max_recent = max_recent
+
+    def record(self, stage: str, seconds: float, tags: dict = None, error: bool = False):
+        with self._lock:
+            self._recent.setdefault(stage, deque(maxlen=self.max_recent)).append(seconds)
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+            if error:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+            self._last.append({"stage": stage, "ms": seconds * 1000, **(tags or {})})
+
+    def summary(self) -> dict:
+        """Return count, errors and last/p50/p95 latency in milliseconds for every stage."""
+        with self._lock:
+            stages = {stage: sorted(values) for stage, values in self._recent.items()}
+            last = {stage: values[-1] for stage, values in self._recent.items()}
+            counts, errors = dict(self._counts), dict(self._errors)
+        return {
+            stage: {
+                "count": counts[stage],
+                "errors": errors.get(stage, 0),
+                "last_ms": last[stage] * 1000,
+                "p50_ms": values[len(values) // 2] * 1000,
+                "p95_ms": values[min(len(values) - 1, int(len(values) * 0.95))] * 1000,
+            }
+            for stage, values in stages.items()
+        }
+
+    def recent(self, n: int = 20) -> list:
+        """Return the last n spans, newest first."""
+        with self._lock:
+            return list(self._last)[-n:][::-1]
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._counts.clear()
+            self._errors.clear()
+            self._last.clear()
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def document_context(document_id):
+    """Tag every span opened in this block (on this thread) with the document it works on."""
+    token = _document.set(document_id)
+    try:
+        yield
+    finally:
+        _document.reset(token)
+
+
+@contextmanager
+def span(stage: str, **tags):
+    """Time a pipeline stage, record it in metrics and log it as a structured record.
+
+    The yielded dict can be updated inside the block with sizes only known once the work is done.
+    """
+    tags = dict(tags)
+    if "document" not in tags and _document.get() is not None:
+        tags["document"] = _document.get()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield tags
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.record(stage, seconds, tags, error=error is not None)
+        fields = {"span": stage, "duration_ms": round(seconds * 1000, 3), **tags}
+        if error is None:
+            logger.info(f"{stage} took {seconds * 1000:.1f} ms", extra=fields)
+        else:
+            fields["error"] = repr(error)
+            logger.warning(f"{stage} failed after {seconds * 1000:.1f} ms", extra=fields)
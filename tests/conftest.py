@@ -0,0 +1,8 @@
+# conftest.py
+# lets the tests import the app modules from the repository root and the chunkers from notebooks
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "notebooks"))
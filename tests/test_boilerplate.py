@@ -0,0 +1,41 @@
+# test_boilerplate.py
+from boilerplate import BoilerplateModel, document_boilerplate
+
+
+BODY = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot"]
+
+
+def pages(header_lines: list, footer: str, n: int = 6) -> list:
+    # enough distinct body lines that the body is not at the top or bottom edge of the page
+    return ["\n".join(header_lines + [f"Requirement {word} {line} applies." for line in BODY]
+                      + [footer, f"Page {i} of {n}"])
+            for i, word in enumerate(BODY[:n], 1)]
+
+
+AGENCY_A = pages(["UNCLASSIFIED", "Department of Example", "Solicitation 70-A"], "Agency A PWS")
+AGENCY_A_AGAIN = pages(["UNCLASSIFIED", "Department of Example", "Solicitation 70-B"], "Agency A PWS")
+AGENCY_B = pages(["UNCLASSIFIED", "Other Bureau", "Task Order 12"], "Bureau B SOW")
+
+
+def test_one_shared_line_does_not_merge_templates():
+    model = BoilerplateModel()
+    template_a = model.add_document(None, document_boilerplate(AGENCY_A))
+    template_b = model.add_document(None, document_boilerplate(AGENCY_B))
+    assert template_a != template_b
+
+
+def test_documents_of_one_issuer_share_a_template():
+    model = BoilerplateModel()
+    template = model.add_document(None, document_boilerplate(AGENCY_A))
+    assert model.add_document(None, document_boilerplate(AGENCY_A_AGAIN)) == template
+    assert model.templates[template]["documents"] == 2
+
+
+def test_clean_pages_only_learns_when_asked():
+    model = BoilerplateModel()
+    cleaned = model.clean_pages(AGENCY_A)
+    assert model.templates == {}
+    assert all("Department of Example" not in page and "Page" not in page for page in cleaned)
+    assert all("Requirement" in page for page in cleaned)
+    model.clean_pages(AGENCY_A, learn=True)
+    assert sum(entry["documents"] for entry in model.templates.values()) == 1
@@ -0,0 +1,42 @@
+# test_chunk_pdf.py
+import chunkPDF
+from boilerplate import BoilerplateModel
+
+
+def page(number: int, body: str) -> str:
+    return f"ACME Agency RFP 123\n{body}\nPage {number} of 40"
+
+
+def test_unbroken_document_is_flushed_at_page_breaks():
+    # like the COBOL PWS, one long run of text with no paragraph breaks
+    pages = [" ".join(["word"] * 500) + " " for _ in range(200)]
+    paragraphs = list(chunkPDF.iter_paragraphs(iter(pages), max_carry=5000))
+    assert len(paragraphs) > 1
+    assert max(len(p) for p in paragraphs) <= 5000 + len(pages[0])
+    assert sum(len(p.split()) for p in paragraphs) == 500 * 200
+
+
+def test_paragraph_is_carried_across_a_page_break():
+    pages = ["First paragraph ends here.\n Second paragraph starts", " and ends on the next page.\n Third one."]
+    assert list(chunkPDF.iter_paragraphs(iter(pages))) == [
+        "First paragraph ends here.",
+        "Second paragraph starts and ends on the next page.",
+        "Third one.",
+    ]
+
+
+def test_iter_clean_pages_removes_headers_and_page_numbers():
+    pages = [page(n, f"Section {n} body text.") for n in range(1, 13)]
+    cleaned = list(chunkPDF.iter_clean_pages(iter(pages), window=4))
+    assert len(cleaned) == len(pages)
+    for n, text in enumerate(cleaned, 1):
+        assert f"Section {n} body text." in text
+        assert "ACME Agency" not in text and "of 40" not in text
+
+
+def test_iter_clean_pages_with_boilerplate_model_does_not_learn():
+    model = BoilerplateModel()
+    pages = [page(n, f"Section {n} body text.") for n in range(1, 13)]
+    cleaned = list(chunkPDF.iter_clean_pages(iter(pages), window=4, boilerplate_model=model))
+    assert all("ACME Agency" not in text and "of 40" not in text for text in cleaned)
+    assert model.templates == {}
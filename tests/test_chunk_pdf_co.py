@@ -0,0 +1,19 @@
+# test_chunk_pdf_co.py
+import chunkPDF_co
+
+
+def test_sentence_across_a_page_break_is_kept_whole():
+    pages = ["The contractor shall deliver a monthly status report. The report covers",
+             "risks, staffing and schedule. It is due on the fifth business day."]
+    sentences = list(chunkPDF_co.segment_pages(pages))
+    assert sentences[0] == "The contractor shall deliver a monthly status report."
+    assert sentences[1].split() == "The report covers risks, staffing and schedule.".split()
+    assert sentences[2] == "It is due on the fifth business day."
+
+
+def test_long_unbroken_text_is_not_carried_forever(monkeypatch):
+    monkeypatch.setattr(chunkPDF_co, "MAX_CARRY_CHARS", 100)
+    pages = [" ".join(["word"] * 50) for _ in range(5)]
+    sentences = list(chunkPDF_co.segment_pages(pages))
+    assert len(sentences) == 5
+    assert sum(len(s.split()) for s in sentences) == 250
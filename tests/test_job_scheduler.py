@@ -0,0 +1,144 @@
+# test_job_scheduler.py
+import threading
+import pytest
+from job_scheduler import (JobCancelled, JobScheduler, PRIORITY_BACKGROUND, PRIORITY_FOREGROUND,
+                           PRIORITY_INTERACTIVE, PRIORITY_PREFETCH)
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def scheduler():
+    pool = JobScheduler(max_workers=2, reserved_interactive=1)
+    yield pool
+    pool.shutdown()
+
+
+def blocking_job(started: threading.Event, release: threading.Event):
+    """Job that signals started and polls its token until released, like a long parse."""
+    def run(token):
+        started.set()
+        while not release.wait(0.01):
+            token.check()
+        return "done"
+    return run
+
+
+def occupy_background_worker(scheduler, release):
+    """Run a background job on the only non-reserved worker and wait until it starts."""
+    started = threading.Event()
+    scheduler.submit(blocking_job(started, release), priority=PRIORITY_BACKGROUND)
+    assert started.wait(TIMEOUT)
+
+
+def test_submit_with_same_key_supersedes_previous_job(scheduler):
+    started, release = threading.Event(), threading.Event()
+    cancelled, results = threading.Event(), []
+    scheduler.submit(blocking_job(started, release), key="query", priority=PRIORITY_INTERACTIVE,
+                     on_cancel=cancelled.set, on_result=results.append)
+    assert started.wait(TIMEOUT)
+    finished = threading.Event()
+    scheduler.submit(lambda token: "newer", key="query", priority=PRIORITY_INTERACTIVE,
+                     on_result=lambda r: (results.append(r), finished.set()))
+    assert cancelled.wait(TIMEOUT)
+    assert finished.wait(TIMEOUT)
+    release.set()
+    assert results == ["newer"]
+
+
+def test_cancel_by_key(scheduler):
+    started, release = threading.Event(), threading.Event()
+    cancelled, results = threading.Event(), []
+    job = scheduler.submit(blocking_job(started, release), key="parse", on_cancel=cancelled.set,
+                           on_result=results.append)
+    assert started.wait(TIMEOUT)
+    scheduler.cancel("parse")
+    assert cancelled.wait(TIMEOUT)
+    assert job.token.cancelled and results == []
+    # cancelling a key that is not queued or running is a no-op
+    scheduler.cancel("parse")
+
+
+def test_cancel_queued_job_never_runs(scheduler):
+    release = threading.Event()
+    occupy_background_worker(scheduler, release)
+    ran, cancelled = threading.Event(), threading.Event()
+    scheduler.submit(lambda token: ran.set(), key="prefetch:a.pdf", priority=PRIORITY_PREFETCH,
+                     on_cancel=cancelled.set)
+    scheduler.cancel("prefetch:a.pdf")
+    release.set()
+    assert cancelled.wait(TIMEOUT)
+    assert not ran.is_set()
+
+
+def test_lower_priority_number_runs_first(scheduler):
+    release = threading.Event()
+    occupy_background_worker(scheduler, release)
+    order, done = [], threading.Event()
+
+    def record(name):
+        def run(token):
+            order.append(name)
+            if len(order) == 3:
+                done.set()
+        return run
+
+    # queued while the background worker is busy, so they start in priority order once it is free
+    scheduler.submit(record("prefetch"), priority=PRIORITY_PREFETCH)
+    scheduler.submit(record("background"), priority=PRIORITY_BACKGROUND)
+    scheduler.submit(record("foreground"), priority=PRIORITY_FOREGROUND)
+    release.set()
+    assert done.wait(TIMEOUT)
+    assert order == ["foreground", "background", "prefetch"]
+
+
+def test_background_jobs_never_take_the_reserved_worker(scheduler):
+    release = threading.Event()
+    occupy_background_worker(scheduler, release)
+    queued_ran = threading.Event()
+    scheduler.submit(lambda token: queued_ran.set(), priority=PRIORITY_FOREGROUND)
+    assert not queued_ran.wait(0.2)
+    # the reserved worker is still free for a query
+    query_done = threading.Event()
+    scheduler.submit(lambda token: query_done.set(), priority=PRIORITY_INTERACTIVE)
+    assert query_done.wait(TIMEOUT)
+    assert not queued_ran.is_set()
+    release.set()
+    assert queued_ran.wait(TIMEOUT)
+
+
+def test_promote_moves_queued_job_ahead(scheduler):
+    release = threading.Event()
+    occupy_background_worker(scheduler, release)
+    order, done = [], threading.Event()
+    scheduler.submit(lambda token: order.append("background"), priority=PRIORITY_BACKGROUND)
+    scheduler.submit(lambda token: (order.append("prefetch"), done.set()), key="prefetch:b.pdf",
+                     priority=PRIORITY_PREFETCH)
+    assert scheduler.promote("prefetch:b.pdf", PRIORITY_FOREGROUND)
+    assert not scheduler.promote("missing", PRIORITY_FOREGROUND)
+    release.set()
+    assert done.wait(TIMEOUT)
+    assert order[0] == "prefetch"
+
+
+def test_job_errors_are_reported(scheduler):
+    errors = []
+    failed = threading.Event()
+
+    def fail(token):
+        raise ValueError("bad pdf")
+
+    scheduler.submit(fail, on_error=lambda e: (errors.append(e), failed.set()))
+    assert failed.wait(TIMEOUT)
+    assert isinstance(errors[0], ValueError)
+
+
+def test_token_check_raises_once_cancelled():
+    pool = JobScheduler(max_workers=2)
+    try:
+        job = pool.submit(lambda token: None)
+        job.cancel()
+        with pytest.raises(JobCancelled):
+            job.token.check()
+    finally:
+        pool.shutdown()
@@ -0,0 +1,83 @@
+# test_lexical_index.py
+import numpy as np
+from lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+SENTENCES = [
+    "The contractor shall comply with FAR 52.224-3 privacy training.",
+    "Deliverables are due within 30 days of award.",
+    "The contractor shall provide monthly status reports.",
+    "Privacy training records are kept for the contract term.",
+    "Cloud hosting must meet FedRAMP moderate requirements.",
+    "",
+]
+
+
+def test_tokenize_keeps_compound_tokens_and_their_parts():
+    terms = tokenize("Comply with FAR 52.224-3")
+    assert "52.224-3" in terms
+    assert {"52", "224", "3"} <= set(terms)
+    assert "with" not in terms
+
+
+def test_search_ranks_exact_clause_first():
+    index = LexicalIndex.build(SENTENCES)
+    scores, ids = index.search("52.224-3")
+    assert ids[0] == 0
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_search_scores_are_normalised_by_query_idf():
+    index = LexicalIndex.build(SENTENCES)
+    scores, ids = index.search("privacy training")
+    assert set(ids[:2]) == {0, 3}
+    # every query term present once in a sentence of about average length scores near 1
+    assert 0.5 < scores[0] < 2.0
+    # a query term the index has never seen pulls the score down
+    partial, _ = index.search("privacy training zeppelin")
+    assert partial[0] < scores[0]
+
+
+def test_search_without_known_terms_is_empty():
+    index = LexicalIndex.build(SENTENCES)
+    scores, ids = index.search("zeppelin")
+    assert len(scores) == 0 and len(ids) == 0
+    scores, ids = index.search("privacy", k=0)
+    assert len(ids) == 0
+
+
+def test_search_returns_at_most_k():
+    index = LexicalIndex.build(SENTENCES)
+    _, ids = index.search("privacy training", k=1)
+    assert len(ids) == 1
+
+
+def test_save_load_round_trip(tmp_path):
+    index = LexicalIndex.build(SENTENCES)
+    path = str(tmp_path / "index")
+    index.save(path)
+    loaded = LexicalIndex.load(path)
+    assert loaded.terms == index.terms
+    np.testing.assert_array_equal(loaded.offsets, index.offsets)
+    np.testing.assert_array_equal(loaded.ids, index.ids)
+    np.testing.assert_array_equal(loaded.tfs, index.tfs)
+    np.testing.assert_array_equal(loaded.lengths, index.lengths)
+    for query in ("52.224-3", "privacy training", "contractor shall provide reports"):
+        expected_scores, expected_ids = index.search(query)
+        scores, ids = loaded.search(query)
+        np.testing.assert_array_equal(ids, expected_ids)
+        np.testing.assert_allclose(scores, expected_scores)
+
+
+def test_save_load_empty_index(tmp_path):
+    index = LexicalIndex.build([])
+    path = str(tmp_path / "empty")
+    index.save(path)
+    loaded = LexicalIndex.load(path)
+    assert len(loaded) == 0 and loaded.terms == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    ids, scores = reciprocal_rank_fusion([np.array([1, 2, 3]), np.array([2, 4])])
+    assert ids[0] == 2
+    assert set(ids) == {1, 2, 3, 4}
+    assert np.all(np.diff(scores) <= 0)
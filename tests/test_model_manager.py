@@ -0,0 +1,31 @@
+# test_model_manager.py
+import threading
+import model_manager
+from model_manager import ModelManager, READY
+
+TIMEOUT = 5
+
+
+def test_concurrent_loads_over_budget_do_not_deadlock(monkeypatch):
+    monkeypatch.setattr(model_manager, "estimate_size_mb", lambda model: 10.0)
+    manager = ModelManager(idle_timeout=0, memory_budget_mb=15)
+    names = ("embed", "summarize")
+    for name in names:
+        manager.register(name, object)
+    # both loads finish before either enforces the budget
+    both_ready = threading.Barrier(len(names), timeout=TIMEOUT)
+    manager.add_listener(lambda name, status: both_ready.wait() if status == READY else None)
+    threads = [manager.preload(name) for name in names]
+    for thread in threads:
+        thread.join(TIMEOUT)
+    assert not any(thread.is_alive() for thread in threads)
+    assert manager.loaded_size_mb() <= 15
+
+
+def test_get_returns_loaded_model():
+    manager = ModelManager(idle_timeout=0)
+    manager.register("embed", object)
+    model = manager.get("embed")
+    assert model is not None and manager.get("embed") is model
+    manager.unload("embed")
+    assert manager.get("embed") is not model